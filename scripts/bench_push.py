@@ -0,0 +1,82 @@
+"""
+对比托管 .gitattributes 前后推送二进制资产到本地裸仓库的耗时
+
+用法: python scripts/bench_push.py [--files 8] [--size-mb 16] [--revisions 3]
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from asset_handoffer.core import BINARY_GIT_SETTINGS, write_gitattributes
+from asset_handoffer.git import GitRepo
+
+EXTENSIONS = ["fbx", "psd", "wav"]
+
+
+def git(*args, cwd=None):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def run(root: Path, managed: bool, files: int, size: int, revisions: int) -> float:
+    remote = root / "remote.git"
+    work = root / "work"
+    git("init", "--bare", "-b", "main", str(remote))
+    git("clone", str(remote), str(work))
+    git("config", "user.name", "bench", cwd=work)
+    git("config", "user.email", "bench@local", cwd=work)
+    git("checkout", "-b", "main", cwd=work)
+
+    assets = work / "Assets"
+    assets.mkdir()
+    if managed:
+        GitRepo(work).set_config(BINARY_GIT_SETTINGS)
+        write_gitattributes(assets / ".gitattributes", EXTENSIONS)
+
+    elapsed = 0.0
+    for rev in range(revisions):
+        for i in range(files):
+            path = assets / f"Asset_{i}.{EXTENSIONS[i % len(EXTENSIONS)]}"
+            if rev == 0:
+                path.write_bytes(os.urandom(size))
+            else:
+                # 模拟美术修改：改写文件中的一段，其余内容不变
+                data = bytearray(path.read_bytes())
+                offset = (rev * 7919 * 1024) % (size - 65536)
+                data[offset : offset + 65536] = os.urandom(65536)
+                path.write_bytes(bytes(data))
+        git("add", "-A", cwd=work)
+        git("commit", "-m", f"rev {rev}", cwd=work)
+
+        start = time.perf_counter()
+        git("push", "origin", "main", cwd=work)
+        elapsed += time.perf_counter() - start
+
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--size-mb", type=int, default=16)
+    parser.add_argument("--revisions", type=int, default=3)
+    args = parser.parse_args()
+
+    for managed in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            elapsed = run(
+                Path(tmp),
+                managed,
+                args.files,
+                args.size_mb * 1024 * 1024,
+                args.revisions,
+            )
+        label = "managed" if managed else "default"
+        print(f"{label:8} push {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
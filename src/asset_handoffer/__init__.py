@@ -9,7 +9,13 @@
     process_file,
     process_batch,
 )
-from .git import GitRepo, GitError
+from .git import AsyncGitRepo, GitRepo, GitError
+from .pipeline import Pipeline, Plan, process_async, process_batch_async
+from .progress import GitProgress, ProgressDisplay
+from .push import PushGroup, PushStatus, PushTarget
+from .rules import RuleStats, explain_filename
+from .server import IngestServer
+from .transforms import TransformError, TransformResult, TransformStage
 from .i18n import Messages
 
 __version__ = "0.12.2"
@@ -24,7 +30,23 @@ __all__ = [
     "compute_target_path",
     "process_file",
     "process_batch",
+    "process_async",
+    "process_batch_async",
+    "Pipeline",
+    "Plan",
+    "PushGroup",
+    "PushStatus",
+    "PushTarget",
+    "GitProgress",
+    "ProgressDisplay",
+    "RuleStats",
+    "IngestServer",
+    "explain_filename",
     "GitRepo",
+    "AsyncGitRepo",
     "GitError",
+    "TransformError",
+    "TransformResult",
+    "TransformStage",
     "Messages",
 ]
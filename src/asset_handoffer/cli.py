@@ -1,18 +1,28 @@
 import typer
 from pathlib import Path
+import asyncio
+import functools
+import inspect
 import shutil
+from typing import Callable
 
 from .core import (
     Config,
     ConfigError,
+    Destination,
     ProcessError,
     parse_filename,
-    compute_target_path,
-    process_file,
     process_batch,
+    resolve_target,
 )
 from .git import GitRepo, GitError
 from .i18n import Messages
+from .pipeline import Pipeline
+from .profiling import profile_run
+from .progress import ProgressDisplay
+from .push import PushGroup, PushStatus, PushTarget
+from .rules import RuleStats, explain_filename
+from .server import IngestServer
 
 app = typer.Typer(help="资产交付器", no_args_is_help=True)
 
@@ -25,7 +35,158 @@ def load_config(config_file: Path) -> Config:
         raise typer.Exit(1)
 
 
+def profiled(func):
+    """为命令添加 --profile 选项，关闭时不引入额外开销"""
+
+    @functools.wraps(func)
+    def wrapper(*args, profile: bool = False, **kwargs):
+        if not profile:
+            return func(*args, **kwargs)
+        directory = _profile_dir(kwargs.get("config_file"))
+        m = Messages()
+        typer.echo(m.t("profile.started", path=directory), err=True)
+        with profile_run(func.__name__, directory, lambda s: typer.echo(s, err=True)):
+            return func(*args, **kwargs)
+
+    signature = inspect.signature(func)
+    option = inspect.Parameter(
+        "profile",
+        inspect.Parameter.KEYWORD_ONLY,
+        default=typer.Option(False, "--profile", help="记录性能分析数据"),
+        annotation=bool,
+    )
+    wrapper.__signature__ = signature.replace(
+        parameters=[*signature.parameters.values(), option]
+    )
+    return wrapper
+
+
+def _profile_dir(config_file: Path | None) -> Path:
+    if config_file:
+        try:
+            return Config.load(config_file).workspace_root / "profiles"
+        except ConfigError:
+            pass
+    return Path.cwd() / "profiles"
+
+
+async def _process(
+    config: Config, file_list: list[Path], yes: bool
+) -> tuple[int, int, Pipeline] | None:
+    """拉取与规划并行；确认期间变换继续在进程池中执行"""
+    m = config.messages
+    display = ProgressDisplay()
+    echo = display.wrap(typer.echo)
+    pipeline = Pipeline(
+        config,
+        output=echo,
+        push=True,
+        on_push_status=_report_push(m, echo),
+        on_progress=display.update,
+    )
+    async with pipeline:
+        try:
+            plans = await pipeline.plan(file_list)
+            await pipeline.sync()
+        except GitError as e:
+            typer.echo(str(e), err=True)
+            raise typer.Exit(1)
+
+        valid = [p for p in plans if p.valid]
+        invalid = [p for p in plans if not p.valid]
+        overrides = [p for p in valid if p.target_path.exists()]
+
+        typer.echo(m.t("process.found_files", count=len(file_list)))
+        typer.echo()
+
+        for p in valid:
+            suffix = m.t("process.status_override") if p in overrides else ""
+            target = _display_target(config, p.destination, p.target_path)
+            typer.echo(f"  {p.file_path.name} -> {target} {suffix}".rstrip())
+
+        for p in invalid:
+            typer.echo(f"  {p.file_path.name} -> {m.t('process.status_invalid')}")
+
+        if not valid:
+            typer.echo(m.t("process.no_valid_files"))
+            return None
+
+        if not yes:
+            typer.echo()
+            prompt = (
+                m.t("process.override_confirm", count=len(overrides))
+                if overrides
+                else m.t("process.confirm")
+            )
+            if not typer.confirm(prompt):
+                typer.echo(m.t("delete.cancelled"))
+                return None
+
+        typer.echo()
+        try:
+            success, failed = await pipeline.run(valid)
+        finally:
+            display.clear()
+        return success, failed + len(invalid), pipeline
+
+
+def _display_target(config: Config, dest: Destination, target: Path) -> str:
+    rel = target.relative_to(dest.repo)
+    if dest.repo == config.repo:
+        return str(rel)
+    return f"[{dest.name}@{dest.branch}] {rel}"
+
+
+def _report_push(
+    m: Messages, echo: Callable[..., None] = typer.echo
+) -> Callable[[PushStatus], None]:
+    def report(status: PushStatus):
+        key = "push.status_ok" if status.success else "push.status_failed"
+        echo(
+            m.t(
+                key,
+                name=status.target.name,
+                seconds=status.seconds,
+                attempts=status.attempts,
+                error=status.error,
+            ),
+            err=not status.success,
+        )
+
+    return report
+
+
+def _check_push(m: Messages, statuses: list[PushStatus], pending: list[PushTarget]):
+    if pending:
+        names = ", ".join(t.name for t in pending)
+        typer.echo(m.t("push.background", names=names))
+
+    failed = [s for s in statuses if not s.success]
+    if failed:
+        typer.echo(m.t("process.push_failed", error=failed[0].error), err=True)
+        raise typer.Exit(1)
+
+
+def push_all(config: Config):
+    """并行推送到 origin 和镜像，必需的远程失败时退出"""
+    m = config.messages
+    typer.echo(m.t("process.pushing"))
+    display = ProgressDisplay()
+    group = PushGroup(
+        config.repo,
+        m,
+        config.push_targets,
+        config.git_branch,
+        on_status=_report_push(m, display.wrap(typer.echo)),
+        on_progress=display.update,
+    )
+    statuses = group.start().wait_required()
+    display.clear()
+    _check_push(m, statuses, group.pending)
+
+
 @app.command()
+@profiled
 def init(
     git_url: str = typer.Option(..., prompt="Git仓库URL"),
     asset_root: str = typer.Option("Assets/GameRes/", prompt="资产根路径"),
@@ -56,6 +217,7 @@ def init(
 
 
 @app.command()
+@profiled
 def setup(
     config_file: Path,
     yes: bool = typer.Option(False, "-y", "--yes", help="跳过确认"),
@@ -63,43 +225,62 @@ def setup(
     """初始化工作区"""
     config = load_config(config_file)
     m = config.messages
-    repo = GitRepo(config.repo, m, config.git_token)
 
     typer.echo(m.t("setup.repository", url=config.git_url))
     typer.echo(m.t("setup.workspace", path=config.workspace_root))
 
+    for dest in config.destinations:
+        _setup_destination(config, dest, yes)
+
+    typer.echo(m.t("setup.done_title"))
+    typer.echo(m.t("setup.usage_put_files", inbox=config.inbox))
+    typer.echo(m.t("setup.usage_run_handoff"))
+
+
+def _setup_destination(config: Config, dest: Destination, yes: bool):
+    m = config.messages
+    display = ProgressDisplay()
+    repo = GitRepo(dest.repo, m, dest.token, progress=display.update)
+
+    if dest.repo != config.repo:
+        typer.echo()
+        typer.echo(
+            m.t("setup.target", name=dest.name, url=dest.url, branch=dest.branch)
+        )
+
     if repo.exists():
-        typer.echo(m.t("setup.repo_exists_warning", path=config.repo))
+        typer.echo(m.t("setup.repo_exists_warning", path=dest.repo))
         if not (yes or typer.confirm(m.t("setup.repo_exists_confirm"))):
             typer.echo(m.t("setup.skip_clone"))
             return
-        shutil.rmtree(config.repo)
+        shutil.rmtree(dest.repo)
 
     typer.echo(m.t("setup.verifying"))
-    if not repo.verify_remote(config.git_url, config.git_branch):
+    if not repo.verify_remote(dest.url, dest.branch):
         typer.echo(m.t("git.verify_failed"), err=True)
         raise typer.Exit(1)
 
     config.ensure_dirs()
+    dest.repo.parent.mkdir(parents=True, exist_ok=True)
     typer.echo(m.t("setup.cloning"))
 
     try:
         repo.clone(
-            config.git_url,
-            config.git_branch,
+            dest.url,
+            dest.branch,
             config.git_user_name,
             config.git_user_email,
         )
+        repo.set_config(config.git_settings)
     except GitError as e:
+        display.clear()
         typer.echo(str(e), err=True)
         raise typer.Exit(1)
-
-    typer.echo(m.t("setup.done_title"))
-    typer.echo(m.t("setup.usage_put_files", inbox=config.inbox))
-    typer.echo(m.t("setup.usage_run_handoff"))
+    display.clear()
 
 
 @app.command()
+@profiled
 def process(
     config_file: Path,
     files: list[Path] = typer.Option(None, "-f", "--file"),
@@ -114,87 +295,18 @@ def process(
         typer.echo(m.t("process.repo_not_exists"), err=True)
         raise typer.Exit(1)
 
-    file_list = files or [f for f in config.inbox.iterdir() if f.is_file()]
+    file_list = files or config.inbox_files()
     if not file_list:
         typer.echo(m.t("status.empty"))
         return
 
     typer.echo(m.t("process.syncing"))
-    try:
-        repo.pull()
-    except GitError as e:
-        typer.echo(str(e), err=True)
-        raise typer.Exit(1)
-
-    valid = []
-    invalid = []
-    overrides = []
-
-    for f in file_list:
-        parsed = parse_filename(f.name, config.naming_rules)
-        if not parsed:
-            invalid.append(f)
-            continue
-        try:
-            target = compute_target_path(
-                parsed, config.path_template, config.asset_root, config.repo
-            )
-        except ProcessError:
-            invalid.append(f)
-            continue
-        is_override = target.exists()
-        valid.append((f, target, is_override))
-        if is_override:
-            overrides.append(f)
-
-    typer.echo(m.t("process.found_files", count=len(file_list)))
-    typer.echo()
-
-    for f, target, is_override in valid:
-        suffix = m.t("process.status_override") if is_override else ""
-        typer.echo(f"  {f.name} -> {target.relative_to(config.repo)} {suffix}".rstrip())
-
-    for f in invalid:
-        typer.echo(f"  {f.name} -> {m.t('process.status_invalid')}")
-
-    if not valid:
-        typer.echo(m.t("process.no_valid_files"))
+    result = asyncio.run(_process(config, file_list, yes))
+    if result is None:
         return
+    success_count, failed_count, pipeline = result
 
-    if not yes:
-        typer.echo()
-        prompt = (
-            m.t("process.override_confirm", count=len(overrides))
-            if overrides
-            else m.t("process.confirm")
-        )
-        if not typer.confirm(prompt):
-            typer.echo(m.t("delete.cancelled"))
-            return
-
-    typer.echo()
-    success_count = 0
-    failed_count = len(invalid)
-
-    for i, (f, target, _) in enumerate(valid, 1):
-        typer.echo(
-            m.t("process.processing", current=i, total=len(valid), filename=f.name)
-        )
-        result = process_file(f, config, output=typer.echo)
-        if result.success:
-            success_count += 1
-        else:
-            failed_count += 1
-
-    # 统一 push 所有 commits
-    if success_count > 0:
-        typer.echo()
-        typer.echo(m.t("process.pushing"))
-        try:
-            repo.push()
-        except GitError as e:
-            typer.echo(m.t("process.push_failed", error=str(e)), err=True)
-            raise typer.Exit(1)
+    _check_push(m, pipeline.push_statuses, pipeline.push_pending)
 
     typer.echo()
     typer.echo(m.t("process.summary_success", success=success_count))
@@ -206,12 +318,13 @@ def process(
 
 
 @app.command()
+@profiled
 def status(config_file: Path):
     """查看收件箱状态"""
     config = load_config(config_file)
     m = config.messages
 
-    files = [f for f in config.inbox.iterdir() if f.is_file()]
+    files = config.inbox_files()
     typer.echo(m.t("setup.inbox_dir", path=config.inbox))
     typer.echo()
 
@@ -224,14 +337,13 @@ def status(config_file: Path):
 
     for f in files:
         size_mb = f.stat().st_size / (1024 * 1024)
-        parsed = parse_filename(f.name, config.naming_rules)
+        parsed = parse_filename(f.name, config.ordered_naming_rules)
         if parsed:
             try:
-                target = compute_target_path(
-                    parsed, config.path_template, config.asset_root, config.repo
-                )
+                dest, target = resolve_target(parsed, config)
                 typer.echo(
-                    f"  {f.name} ({size_mb:.1f}MB) -> {target.relative_to(config.repo)}"
+                    f"  {f.name} ({size_mb:.1f}MB) -> "
+                    f"{_display_target(config, dest, target)}"
                 )
             except ProcessError:
                 typer.echo(
@@ -244,6 +356,72 @@ def status(config_file: Path):
 
 
 @app.command()
+@profiled
+def explain(
+    config_file: Path,
+    filename: str = typer.Argument(None, help="要解释的文件名"),
+):
+    """查看文件名命中的规则和规则统计"""
+    config = load_config(config_file)
+    m = config.messages
+    stats = config.rule_stats
+    rules = config.ordered_naming_rules
+
+    if config.adaptive_rule_order:
+        typer.echo(m.t("explain.adaptive_order"))
+
+    if not filename:
+        for i, rule in enumerate(rules, 1):
+            _echo_rule_stats(m, i, rule, stats)
+        return
+
+    trials = explain_filename(filename, rules)
+    for trial in trials:
+        status = m.t("explain.match" if trial.matched else "explain.miss")
+        typer.echo(
+            m.t(
+                "explain.trial",
+                index=trial.index + 1,
+                status=status,
+                micros=trial.seconds * 1e6,
+                pattern=trial.rule.get("pattern", ""),
+            )
+        )
+        _echo_rule_stats(m, None, trial.rule, stats)
+
+    typer.echo()
+    if not trials or not trials[-1].matched:
+        typer.echo(m.t("parse.filename_not_match", filename=filename))
+        raise typer.Exit(1)
+
+    parsed = parse_filename(filename, [trials[-1].rule])
+    try:
+        dest, target = resolve_target(parsed, config)
+    except ProcessError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(1)
+    typer.echo(m.t("process.target", path=_display_target(config, dest, target)))
+
+
+def _echo_rule_stats(m: Messages, index: int | None, rule: dict, stats: RuleStats):
+    pattern = rule.get("pattern", "")
+    entry = stats.rules.get(pattern, {})
+    hits, misses = entry.get("hits", 0), entry.get("misses", 0)
+    tries = hits + misses
+    if index is not None:
+        typer.echo(f"#{index} {pattern}")
+    typer.echo(
+        m.t(
+            "explain.stats",
+            hits=hits,
+            misses=misses,
+            micros=entry.get("seconds", 0.0) / tries * 1e6 if tries else 0.0,
+        )
+    )
+
+
+@app.command()
+@profiled
 def delete(
     pattern: str,
     config_file: Path,
@@ -272,10 +450,38 @@ def delete(
         repo.remove(match)
 
     repo.commit(f"Delete: {pattern}")
-    repo.push()
+    push_all(config)
     typer.echo(m.t("delete.deleted", count=len(matches)))
 
 
+@app.command()
+@profiled
+def serve(
+    config_file: Path,
+    host: str = typer.Option(None, "--host", help="监听地址"),
+    port: int = typer.Option(None, "--port", help="监听端口"),
+):
+    """启动 HTTP 上传服务"""
+    config = load_config(config_file)
+    m = config.messages
+
+    if not GitRepo(config.repo, m, config.git_token).exists():
+        typer.echo(m.t("process.repo_not_exists"), err=True)
+        raise typer.Exit(1)
+
+    server = IngestServer(
+        config, host, port, output=typer.echo, on_push_status=_report_push(m)
+    )
+    host, port = server.server_address[:2]
+    typer.echo(m.t("serve.listening", url=f"http://{host}:{port}/"))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        typer.echo(m.t("serve.stopped"))
+    finally:
+        server.server_close()
+
+
 def main():
     app()
 
@@ -1,12 +1,22 @@
+import asyncio
 import re
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from dataclasses import dataclass
-from typing import Callable, NamedTuple
+from functools import cached_property
+from typing import TYPE_CHECKING, Callable, NamedTuple
 import yaml
 
 from .i18n import Messages
+from .push import PushTarget
+from .rules import RuleStats
+from .transforms import TransformError, TransformResult, TransformStage, output_name
+
+if TYPE_CHECKING:
+    from .git import GitRepo
 
 
 class ConfigError(Exception):
@@ -21,6 +31,27 @@ class ProcessError(Exception):
     pass
 
 
+GITATTRIBUTES_BEGIN = "# >>> asset-handoffer managed >>>"
+GITATTRIBUTES_END = "# <<< asset-handoffer managed <<<"
+
+# 配置了二进制扩展名时默认应用的 git 设置，可被 git.settings 覆盖
+BINARY_GIT_SETTINGS = {"core.bigFileThreshold": "1m"}
+
+
+DEFAULT_TARGET = "default"
+PROCESS_SCRIPT = "handoff.bat"
+
+
+class Destination(NamedTuple):
+    name: str
+    url: str
+    branch: str
+    repo: Path
+    asset_root: str
+    token: str | None
+    push_targets: tuple[PushTarget, ...]
+
+
 class ProcessResult(NamedTuple):
     success: bool
     message: str
@@ -92,6 +123,24 @@ class Config:
             )
         if not self.data.get("git", {}).get("repository"):
             raise ConfigError(m.t("config.missing_field", field="git.repository"))
+        for name, spec in [("git", self.data.get("git", {}))] + [
+            (f"git.targets.{name}", spec) for name, spec in self.git_targets.items()
+        ]:
+            if not spec.get("repository"):
+                raise ConfigError(
+                    m.t("config.missing_field", field=f"{name}.repository")
+                )
+            for mirror in spec.get("mirrors") or []:
+                if not isinstance(mirror, str) and not mirror.get("url"):
+                    raise ConfigError(
+                        m.t("config.missing_field", field=f"{name}.mirrors.url")
+                    )
+        for rule in self.naming_rules:
+            target = rule.get("target")
+            if target and target != DEFAULT_TARGET and target not in self.git_targets:
+                raise ConfigError(
+                    m.t("config.missing_field", field=f"git.targets.{target}")
+                )
         if "asset_root" not in self.data:
             raise ConfigError(m.t("config.missing_field", field="asset_root"))
         if not has_rules and "path_template" not in self.data:
@@ -106,8 +155,60 @@ class Config:
         return self.data.get("git", {}).get("branch", "main")
 
     @property
-    def git_token(self) -> str:
-        return self.data.get("git", {}).get("token", "")
+    def git_token(self) -> str | None:
+        """未配置时为 None，由 GitRepo 读取环境变量 GIT_TOKEN"""
+        return self.data.get("git", {}).get("token") or None
+
+    @property
+    def push_targets(self) -> list[PushTarget]:
+        return list(self.destination().push_targets)
+
+    @property
+    def git_targets(self) -> dict:
+        return self.data.get("git", {}).get("targets") or {}
+
+    def destination(
+        self, target: str | None = None, branch: str | None = None
+    ) -> Destination:
+        """规则可以指定目标仓库和分支，每个仓库/分支组合使用独立的本地克隆"""
+        name = target or DEFAULT_TARGET
+        if name == DEFAULT_TARGET:
+            spec = self.data.get("git", {})
+            asset_root = self.asset_root
+        else:
+            spec = self.git_targets[name]
+            asset_root = spec.get("asset_root", self.asset_root)
+
+        branch = branch or spec.get("branch", "main")
+        if name == DEFAULT_TARGET and branch == self.git_branch:
+            repo = self.repo
+        else:
+            repo = self.workspace_root / ".repos" / f"{name}@{branch.replace('/', '_')}"
+
+        # 其他目标仓库不沿用顶层令牌，避免发送到不同的主机
+        token = self.git_token if name == DEFAULT_TARGET else spec.get("token") or ""
+        prefix = "" if name == DEFAULT_TARGET else f"{name}/"
+        return Destination(
+            name=name,
+            url=spec["repository"],
+            branch=branch,
+            repo=repo,
+            asset_root=asset_root,
+            token=token,
+            push_targets=tuple(_push_targets(spec, token, prefix)),
+        )
+
+    def destination_for(self, parsed: dict) -> Destination:
+        return self.destination(parsed.get("target"), parsed.get("branch"))
+
+    @property
+    def destinations(self) -> list[Destination]:
+        """默认目标以及命名规则引用的所有目标"""
+        found = {}
+        for rule in [{}] + self.naming_rules:
+            dest = self.destination(rule.get("target"), rule.get("branch"))
+            found.setdefault(dest.repo, dest)
+        return list(found.values())
 
     @property
     def git_commit_template(self) -> str:
@@ -125,6 +226,17 @@ class Config:
             .get("email", "asset-handoffer@local")
         )
 
+    @property
+    def binary_extensions(self) -> list[str]:
+        exts = self.data.get("git", {}).get("binary_extensions") or []
+        return sorted({str(e).lower().lstrip(".") for e in exts})
+
+    @property
+    def git_settings(self) -> dict:
+        settings = dict(BINARY_GIT_SETTINGS) if self.binary_extensions else {}
+        settings.update(self.data.get("git", {}).get("settings") or {})
+        return settings
+
     @property
     def asset_root(self) -> str:
         return self.data.get("asset_root", "")
@@ -149,10 +261,61 @@ class Config:
             ]
         return []
 
+    @property
+    def adaptive_rule_order(self) -> bool:
+        return bool(self.data.get("naming", {}).get("adaptive_order", False))
+
+    @cached_property
+    def rule_stats(self) -> RuleStats:
+        return RuleStats.load(self.cache_dir / "rule_stats.json")
+
+    @property
+    def ordered_naming_rules(self) -> list[dict]:
+        if self.adaptive_rule_order:
+            return self.rule_stats.ordered(self.naming_rules)
+        return self.naming_rules
+
+    @property
+    def fast_lane_bytes(self) -> int:
+        """不超过该大小的文件进入快速通道，0 表示不拆分"""
+        mb = self.data.get("schedule", {}).get("fast_lane_mb", 16)
+        return int(float(mb) * 1024 * 1024)
+
+    @property
+    def serve_settings(self) -> dict:
+        """serve 命令的设置，未填写的项使用默认值"""
+        serve = self.data.get("serve") or {}
+        return {
+            "host": serve.get("host", "127.0.0.1"),
+            "port": int(serve.get("port", 8765)),
+            "token": serve.get("token", ""),
+            "batch_window": float(serve.get("batch_window", 2.0)),
+            "max_batch": int(serve.get("max_batch", 32)),
+        }
+
+    @property
+    def cache_dir(self) -> Path:
+        return self.workspace_root / ".cache"
+
+    @property
+    def transform_cache(self) -> Path:
+        return self.cache_dir / "transforms"
+
+    @property
+    def transform_cache_days(self) -> float:
+        """超过该天数未使用的变换缓存在处理结束时删除，0 表示不清理"""
+        return float((self.data.get("transforms") or {}).get("cache_days", 30))
+
     @property
     def naming_examples(self) -> list[str]:
         return [r.get("example", "") for r in self.naming_rules if r.get("example")]
 
+    def inbox_files(self) -> list[Path]:
+        """inbox 中待处理的文件，不含生成的 handoff 脚本"""
+        return [
+            f for f in self.inbox.iterdir() if f.is_file() and f.name != PROCESS_SCRIPT
+        ]
+
     def ensure_dirs(self):
         self.inbox.mkdir(parents=True, exist_ok=True)
         self.failed.mkdir(parents=True, exist_ok=True)
@@ -160,7 +323,7 @@ class Config:
 
     def _generate_process_script(self):
         """在 inbox 中生成 handoff 脚本"""
-        script_path = self.inbox / "handoff.bat"
+        script_path = self.inbox / PROCESS_SCRIPT
         config_rel_path = self.config_file.relative_to(self.inbox.parent)
 
         # 检测 Python 路径：优先使用嵌入式 Python，否则使用系统 Python
@@ -230,22 +393,30 @@ pause
         return output_file
 
 
-def parse_filename(filename: str, rules: list[dict]) -> dict | None:
+def parse_filename(
+    filename: str, rules: list[dict], stats: RuleStats | None = None
+) -> dict | None:
     for rule in rules:
         pattern = rule.get("pattern", "")
+        start = time.perf_counter()
         try:
             compiled = re.compile(pattern)
         except re.error:
             continue
 
         match = compiled.match(filename)
-        if match:
-            groups = match.groupdict()
-            if "ext" not in groups and "extension" not in groups:
-                continue
+        groups = match.groupdict() if match else {}
+        matched = "ext" in groups or "extension" in groups
+        if stats is not None:
+            stats.record(pattern, matched, time.perf_counter() - start)
+        if matched:
             return {
                 "groups": groups,
                 "path_template": rule.get("path_template", ""),
+                "transforms": rule.get("transforms") or [],
+                "target": rule.get("target"),
+                "branch": rule.get("branch"),
+                "priority": int(rule.get("priority", 0)),
                 "original_name": filename,
             }
     return None
@@ -265,58 +436,258 @@ def compute_target_path(
     return repo_base / asset_root / rel_path
 
 
+def resolve_target(
+    parsed: dict, config: Config, transformed_name: str | None = None
+) -> tuple[Destination, Path]:
+    """规则配置了变换时，目标路径使用变换输出的文件名（未给出时按 output 推断）"""
+    dest = config.destination_for(parsed)
+    target_path = compute_target_path(
+        parsed, config.path_template, dest.asset_root, dest.repo
+    )
+    if parsed.get("transforms"):
+        name = transformed_name or output_name(
+            parsed["original_name"], parsed["transforms"]
+        )
+        if name:
+            target_path = transformed_target(parsed, target_path, name, config)
+    return dest, target_path
+
+
+def _push_targets(spec: dict, token: str | None, prefix: str = "") -> list[PushTarget]:
+    targets = [
+        PushTarget(
+            f"{prefix}origin", "origin", True, int(spec.get("retries", 0)), token
+        )
+    ]
+    for mirror in spec.get("mirrors") or []:
+        if isinstance(mirror, str):
+            mirror = {"url": mirror}
+        targets.append(
+            PushTarget(
+                name=prefix + (mirror.get("name") or mirror["url"]),
+                remote=mirror["url"],
+                required=bool(mirror.get("required", False)),
+                retries=int(mirror.get("retries", 2)),
+                # 镜像通常在其他主机上，不能默认带上 origin 的令牌
+                token=mirror.get("token") or "",
+            )
+        )
+    return targets
+
+
+def write_gitattributes(path: Path, extensions: list[str]) -> bool:
+    """更新 .gitattributes 中的托管块，返回文件是否有变化"""
+    old = path.read_text(encoding="utf-8") if path.exists() else ""
+    lines = old.splitlines()
+    managed = GITATTRIBUTES_BEGIN in lines and GITATTRIBUTES_END in lines
+    if not managed and not extensions:
+        return False
+    if managed:
+        start = lines.index(GITATTRIBUTES_BEGIN)
+        end = lines.index(GITATTRIBUTES_END)
+        lines = lines[:start] + lines[end + 1 :]
+
+    if extensions:
+        lines += [GITATTRIBUTES_BEGIN]
+        lines += [
+            f"*.{_case_insensitive_glob(ext)} binary -delta" for ext in extensions
+        ]
+        lines += [GITATTRIBUTES_END]
+
+    new = "\n".join(lines) + "\n" if lines else ""
+    if new == old:
+        return False
+    if new:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(new, encoding="utf-8")
+    else:
+        path.unlink()
+    return True
+
+
+def _case_insensitive_glob(ext: str) -> str:
+    return "".join(
+        f"[{c.lower()}{c.upper()}]" if c.lower() != c.upper() else c for c in ext
+    )
+
+
+def prepare_repo(
+    config: Config,
+    repo: "GitRepo",
+    output: Callable[[str], None] = print,
+    asset_root: str | None = None,
+):
+    """应用 git 设置并同步二进制资产的 .gitattributes"""
+    m = config.messages
+    repo.set_config(config.git_settings)
+
+    root = config.asset_root if asset_root is None else asset_root
+    attributes = repo.repo_path / root / ".gitattributes"
+    if write_gitattributes(attributes, config.binary_extensions):
+        repo.add(attributes)
+        repo.commit("Update .gitattributes")
+        output(
+            m.t(
+                "process.gitattributes_updated",
+                path=attributes.relative_to(repo.repo_path),
+            )
+        )
+
+
 def process_file(
-    file_path: Path, config: Config, output: Callable[[str], None] = print
+    file_path: Path,
+    config: Config,
+    output: Callable[[str], None] = print,
+    stage: TransformStage | None = None,
 ) -> ProcessResult:
     from .git import GitRepo, GitError
 
     m = config.messages
-    repo = GitRepo(config.repo, m, config.git_token)
 
+    parsed = parse_filename(
+        file_path.name, config.ordered_naming_rules, config.rule_stats
+    )
+    if not parsed:
+        if not config.repo.joinpath(".git").exists():
+            return ProcessResult(False, m.t("process.repo_not_exists"))
+        move_to_failed(file_path, config)
+        return ProcessResult(False, filename_error(file_path, config))
+
+    dest = config.destination_for(parsed)
+    repo = GitRepo(dest.repo, m, dest.token)
     if not repo.exists():
         return ProcessResult(False, m.t("process.repo_not_exists"))
 
-    parsed = parse_filename(file_path.name, config.naming_rules)
-    if not parsed:
-        msg = m.t(
-            "process.filename_error",
-            error=m.t("parse.filename_not_match", filename=file_path.name),
-            example=", ".join(config.naming_examples),
-        )
-        _move_to_failed(file_path, config)
-        return ProcessResult(False, msg)
-
     try:
-        target_path = compute_target_path(
-            parsed, config.path_template, config.asset_root, config.repo
-        )
+        _, target_path = resolve_target(parsed, config)
     except ProcessError as e:
-        _move_to_failed(file_path, config)
+        move_to_failed(file_path, config)
         return ProcessResult(False, str(e))
 
-    target_path.parent.mkdir(parents=True, exist_ok=True)
-    shutil.move(str(file_path), str(target_path))
+    transformed = None
+    if parsed["transforms"]:
+        try:
+            if stage is None:
+                with TransformStage(config.transform_cache, max_workers=1) as own:
+                    transformed = own.run(file_path, parsed["transforms"])
+            else:
+                transformed = stage.run(file_path, parsed["transforms"])
+        except TransformError as e:
+            move_to_failed(file_path, config)
+            return ProcessResult(False, m.t("process.transform_failed", error=str(e)))
+        report_transforms(transformed, output, m)
+        _, target_path = resolve_target(parsed, config, transformed.path.name)
+
+    place_file(file_path, target_path, transformed)
 
     try:
-        repo.add(target_path)
-        commit_msg = config.git_commit_template.format(**parsed["groups"])
-        repo.commit(commit_msg)
+        for path in placed_paths(target_path, transformed):
+            repo.add(path)
+        repo.commit(config.git_commit_template.format(**parsed["groups"]))
     except GitError as e:
-        if file_path.parent.exists():
-            shutil.move(str(target_path), str(file_path))
-            return ProcessResult(
-                False, m.t("process.git_failed_moved_back", error=str(e))
-            )
-        else:
-            _move_to_failed(target_path, config)
-            return ProcessResult(False, m.t("process.git_failed", error=str(e)))
+        return rollback_file(file_path, target_path, transformed, config, e)
+
+    return finish_file(file_path, target_path, transformed, config, output, dest.repo)
+
+
+def filename_error(file_path: Path, config: Config) -> str:
+    m = config.messages
+    return m.t(
+        "process.filename_error",
+        error=m.t("parse.filename_not_match", filename=file_path.name),
+        example=", ".join(config.naming_examples),
+    )
+
+
+def transformed_target(
+    parsed: dict, target_path: Path, name: str, config: Config
+) -> Path:
+    if (parsed["path_template"] or config.path_template).endswith("/"):
+        return target_path / name
+    return target_path.with_suffix(Path(name).suffix)
+
 
+def placed_paths(target_path: Path, transformed: TransformResult | None) -> list[Path]:
+    """提交的所有文件：目标文件，以及与它放在同一目录的变换附加输出"""
+    extras = transformed.extras if transformed else ()
+    paths = [target_path] + [extra_target(target_path, transformed, p) for p in extras]
+    return list(dict.fromkeys(paths))
+
+
+def extra_target(target_path: Path, transformed: TransformResult, extra: Path) -> Path:
+    """附加输出以变换结果的文件名主干开头时（如 Hero.ogg.sha256），随目标文件改名"""
+    stem = transformed.path.stem
+    name = extra.name
+    if stem and name.startswith(stem):
+        name = target_path.stem + name[len(stem) :]
+    return target_path.parent / name
+
+
+def place_file(file_path: Path, target_path: Path, transformed: TransformResult | None):
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    if transformed:
+        # 变换结果来自缓存，原文件保留在 inbox 直到提交成功
+        shutil.copy2(str(transformed.path), str(target_path))
+        for src in transformed.extras:
+            shutil.copy2(str(src), str(extra_target(target_path, transformed, src)))
+    else:
+        shutil.move(str(file_path), str(target_path))
+
+
+def rollback_file(
+    file_path: Path,
+    target_path: Path,
+    transformed: TransformResult | None,
+    config: Config,
+    error: Exception,
+) -> ProcessResult:
+    m = config.messages
+    if transformed:
+        for path in placed_paths(target_path, transformed):
+            path.unlink(missing_ok=True)
+        return ProcessResult(
+            False, m.t("process.git_failed_moved_back", error=str(error))
+        )
+    if file_path.parent.exists():
+        shutil.move(str(target_path), str(file_path))
+        return ProcessResult(
+            False, m.t("process.git_failed_moved_back", error=str(error))
+        )
+    else:
+        move_to_failed(target_path, config)
+        return ProcessResult(False, m.t("process.git_failed", error=str(error)))
+
+
+def finish_file(
+    file_path: Path,
+    target_path: Path,
+    transformed: TransformResult | None,
+    config: Config,
+    output: Callable[[str], None] = print,
+    repo_path: Path | None = None,
+) -> ProcessResult:
+    m = config.messages
+    if transformed:
+        file_path.unlink(missing_ok=True)
+
+    repo_path = repo_path or config.repo
     output(m.t("process.success", filename=file_path.name))
-    output(m.t("process.target", path=target_path.relative_to(config.repo)))
+    output(m.t("process.target", path=target_path.relative_to(repo_path)))
     return ProcessResult(True, str(target_path), target_path)
 
 
-def _move_to_failed(file_path: Path, config: Config):
+def report_transforms(
+    result: TransformResult, output: Callable[[str], None], m: Messages
+):
+    if result.cached:
+        output(m.t("process.transform_cached"))
+    for timing in result.timings:
+        output(
+            m.t("process.transform_timing", name=timing.name, seconds=timing.seconds)
+        )
+
+
+def move_to_failed(file_path: Path, config: Config):
     config.failed.mkdir(parents=True, exist_ok=True)
     failed_path = config.failed / file_path.name
     if failed_path.exists():
@@ -331,22 +702,15 @@ def _move_to_failed(file_path: Path, config: Config):
 def process_batch(
     files: list[Path], config: Config, output: Callable[[str], None] = print
 ) -> tuple[int, int]:
-    m = config.messages
-    success = failed = 0
+    """同步入口；已有运行中的事件循环时（Jupyter 等）在工作线程中执行"""
+    from .pipeline import process_batch_async
 
-    for i, file_path in enumerate(files, 1):
-        output(
-            m.t(
-                "process.processing",
-                current=i,
-                total=len(files),
-                filename=file_path.name,
-            )
-        )
-        result = process_file(file_path, config, output)
-        if result.success:
-            success += 1
-        else:
-            failed += 1
+    def run() -> tuple[int, int]:
+        return asyncio.run(process_batch_async(files, config, output))
 
-    return success, failed
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return run()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(run).result()
@@ -1,9 +1,15 @@
+import asyncio
+import codecs
 import subprocess
 import os
+import threading
+import time
 from pathlib import Path
+from typing import Callable
 from urllib.parse import urlparse, urlunparse
 
 from .i18n import Messages
+from .progress import GitProgress, ProgressParser
 
 
 class GitError(Exception):
@@ -11,10 +17,24 @@ class GitError(Exception):
 
 
 class GitRepo:
-    def __init__(self, repo_path: Path, messages: Messages = None, token: str = None):
+    # 每次 git 调用结束后回调 (args, seconds)，仅在 --profile 时设置
+    run_hook: Callable[[list, float], None] | None = None
+
+    def __init__(
+        self,
+        repo_path: Path,
+        messages: Messages = None,
+        token: str | None = None,
+        progress: Callable[[GitProgress], None] | None = None,
+    ):
         self.repo_path = repo_path
         self.messages = messages or Messages()
-        self.token = token or os.getenv("GIT_TOKEN") or os.getenv("GITHUB_TOKEN")
+        # None 时读取环境变量；空字符串表示不使用令牌（镜像和其他主机）
+        if token is None:
+            token = os.getenv("GIT_TOKEN") or os.getenv("GITHUB_TOKEN")
+        self.token = token
+        # clone、pull、push 的传输进度回调
+        self.progress = progress
 
     def exists(self) -> bool:
         return (self.repo_path / ".git").exists()
@@ -43,6 +63,7 @@ class GitRepo:
             self._run(
                 [
                     "clone",
+                    *self._progress_args(),
                     "-b",
                     branch,
                     "--single-branch",
@@ -52,6 +73,7 @@ class GitRepo:
                     str(self.repo_path),
                 ],
                 cwd=None,
+                progress=True,
             )
 
             if self.token:
@@ -65,7 +87,7 @@ class GitRepo:
 
     def pull(self):
         try:
-            self._run(["pull"])
+            self._run(["pull", *self._progress_args()], progress=True)
         except subprocess.CalledProcessError as e:
             raise GitError(self.messages.t("git.pull_failed_new", error=e.stderr))
 
@@ -82,16 +104,26 @@ class GitRepo:
         try:
             self._run(["commit", "-m", message])
         except subprocess.CalledProcessError as e:
-            if "nothing to commit" not in e.stderr:
+            # git 将 "nothing to commit" 输出到 stdout
+            if "nothing to commit" not in e.stdout + e.stderr:
                 raise GitError(self.messages.t("git.commit_failed", error=e.stderr))
 
-    def push(self, branch: str = None):
+    def push(self, branch: str = None, remote: str = "origin"):
         try:
-            args = ["push"] + (["origin", branch] if branch else [])
-            self._run(args)
+            args = ["push", *self._progress_args()]
+            if branch or remote != "origin":
+                args += [self._inject_token(remote), branch or "HEAD"]
+            self._run(args, progress=True)
         except subprocess.CalledProcessError as e:
             raise GitError(self.messages.t("git.push_failed_new", error=e.stderr))
 
+    def set_config(self, settings: dict):
+        try:
+            for key, value in settings.items():
+                self._run(["config", key, str(value)])
+        except subprocess.CalledProcessError as e:
+            raise GitError(self.messages.t("git.config_failed", error=e.stderr))
+
     def remove(self, file_path: Path):
         try:
             rel_path = file_path.relative_to(self.repo_path)
@@ -118,19 +150,166 @@ class GitRepo:
             )
         )
 
+    def _progress_args(self) -> list[str]:
+        # 输出不是终端时 git 默认不报告进度
+        return ["--progress"] if self.progress else []
+
     def _run(
-        self, args: list, cwd: Path | None = ..., check: bool = True
+        self,
+        args: list,
+        cwd: Path | None = ...,
+        check: bool = True,
+        progress: bool = False,
     ) -> subprocess.CompletedProcess:
         work_dir = str(self.repo_path) if cwd is ... else (str(cwd) if cwd else None)
+        hook = GitRepo.run_hook
+        start = time.perf_counter() if hook else 0.0
+        try:
+            if progress and self.progress:
+                return self._run_progress(args, work_dir, check)
+            return subprocess.run(
+                ["git"] + args,
+                cwd=work_dir,
+                check=check,
+                capture_output=True,
+                text=True,
+                env=self._env(),
+            )
+        finally:
+            if hook:
+                hook(args, time.perf_counter() - start)
+
+    def _run_progress(
+        self, args: list, work_dir: str | None, check: bool
+    ) -> subprocess.CompletedProcess:
+        """逐块读取 stderr 并解析进度，stdout 在后台线程中读取以免管道写满"""
+        parser = ProgressParser(args[0], self.progress)
+        proc = subprocess.Popen(
+            ["git"] + args,
+            cwd=work_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=self._env(),
+        )
+        stdout = []
+        reader = threading.Thread(target=lambda: stdout.append(proc.stdout.read()))
+        reader.start()
+
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while chunk := proc.stderr.read1(4096):
+            parser.feed(decoder.decode(chunk))
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        reader.join()
+        proc.wait()
+
+        result = subprocess.CompletedProcess(
+            ["git"] + args,
+            proc.returncode,
+            stdout[0].decode("utf-8", errors="replace"),
+            parser.text,
+        )
+        if check:
+            result.check_returncode()
+        return result
+
+    def _env(self) -> dict:
         env = os.environ.copy()
         if self.token:
             env["GIT_TERMINAL_PROMPT"] = "0"
             env["GCM_INTERACTIVE"] = "never"
-        return subprocess.run(
+        return env
+
+
+class AsyncGitRepo:
+    """GitRepo 的 asyncio 版本，git 子进程通过 asyncio.create_subprocess_exec 运行"""
+
+    def __init__(
+        self,
+        repo_path: Path,
+        messages: Messages = None,
+        token: str | None = None,
+        progress: Callable[[GitProgress], None] | None = None,
+    ):
+        self.repo = GitRepo(repo_path, messages, token, progress)
+        self.messages = self.repo.messages
+
+    def exists(self) -> bool:
+        return self.repo.exists()
+
+    async def fetch(self):
+        try:
+            await self._run(["fetch", *self.repo._progress_args()], progress=True)
+        except subprocess.CalledProcessError as e:
+            raise GitError(self.messages.t("git.pull_failed_new", error=e.stderr))
+
+    async def merge(self):
+        try:
+            await self._run(["merge", "--no-edit", "FETCH_HEAD"])
+        except subprocess.CalledProcessError as e:
+            raise GitError(self.messages.t("git.pull_failed_new", error=e.stderr))
+
+    async def pull(self):
+        await self.fetch()
+        await self.merge()
+
+    async def add(self, file_path: Path):
+        try:
+            rel_path = file_path.relative_to(self.repo.repo_path)
+            await self._run(["add", str(rel_path)])
+        except ValueError:
+            raise GitError(self.messages.t("git.file_not_in_repo", path=file_path))
+        except subprocess.CalledProcessError as e:
+            raise GitError(self.messages.t("git.add_failed", error=e.stderr))
+
+    async def commit(self, message: str):
+        try:
+            await self._run(["commit", "-m", message])
+        except subprocess.CalledProcessError as e:
+            if "nothing to commit" not in e.stdout + e.stderr:
+                raise GitError(self.messages.t("git.commit_failed", error=e.stderr))
+
+    async def _run(
+        self, args: list, check: bool = True, progress: bool = False
+    ) -> subprocess.CompletedProcess:
+        hook = GitRepo.run_hook
+        start = time.perf_counter() if hook else 0.0
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "git",
+                *args,
+                cwd=str(self.repo.repo_path),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env=self.repo._env(),
+            )
+            if progress and self.repo.progress:
+                stdout, stderr = await asyncio.gather(
+                    proc.stdout.read(), self._read_progress(args[0], proc.stderr)
+                )
+                await proc.wait()
+            else:
+                stdout, stderr = await proc.communicate()
+                stderr = stderr.decode("utf-8", errors="replace")
+        finally:
+            if hook:
+                hook(args, time.perf_counter() - start)
+
+        result = subprocess.CompletedProcess(
             ["git"] + args,
-            cwd=work_dir,
-            check=check,
-            capture_output=True,
-            text=True,
-            env=env,
+            proc.returncode,
+            stdout.decode("utf-8", errors="replace"),
+            stderr,
         )
+        if check:
+            result.check_returncode()
+        return result
+
+    async def _read_progress(self, label: str, stream: asyncio.StreamReader) -> str:
+        parser = ProgressParser(label, self.repo.progress)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while chunk := await stream.read(4096):
+            parser.feed(decoder.decode(chunk))
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        return parser.text
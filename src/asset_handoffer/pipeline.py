@@ -0,0 +1,415 @@
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Callable, NamedTuple
+from weakref import WeakKeyDictionary
+
+from .core import (
+    Config,
+    Destination,
+    ProcessError,
+    ProcessResult,
+    filename_error,
+    finish_file,
+    move_to_failed,
+    parse_filename,
+    place_file,
+    placed_paths,
+    prepare_repo,
+    report_transforms,
+    resolve_target,
+    rollback_file,
+)
+from .git import AsyncGitRepo, GitError
+from .progress import GitProgress, relabel
+from .push import PushGroup, PushStatus, PushTarget
+from .transforms import TransformStage, prune_cache
+
+
+class Plan(NamedTuple):
+    file_path: Path
+    parsed: dict | None = None
+    target_path: Path | None = None
+    sha256: str = ""
+    error: str = ""
+    destination: Destination | None = None
+    size: int = 0
+
+    @property
+    def valid(self) -> bool:
+        return self.target_path is not None
+
+
+_repo_locks: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def repo_lock(repo_path: Path) -> asyncio.Lock:
+    """同一事件循环中每个本地仓库一把锁，从同步一直持有到推送结束"""
+    locks = _repo_locks.setdefault(asyncio.get_running_loop(), {})
+    return locks.setdefault(repo_path, asyncio.Lock())
+
+
+def schedule(plans: list[Plan], fast_lane_bytes: int) -> tuple[list[Plan], list[Plan]]:
+    """按规则优先级（高者优先）和文件大小排序，拆分为快速通道和大文件"""
+    ordered = sorted(plans, key=_schedule_key)
+    if fast_lane_bytes <= 0:
+        return ordered, []
+    fast = [p for p in ordered if p.size <= fast_lane_bytes]
+    large = [p for p in ordered if p.size > fast_lane_bytes]
+    return fast, large
+
+
+def _schedule_key(plan: Plan) -> tuple[int, int]:
+    return -int(plan.parsed.get("priority", 0)), plan.size
+
+
+def file_sha256(file_path: Path) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Pipeline:
+    """异步处理流水线：拉取与规划并行，各目标仓库的移动、提交和推送并行执行"""
+
+    def __init__(
+        self,
+        config: Config,
+        output: Callable[[str], None] = print,
+        pull: bool = True,
+        push: bool = False,
+        on_push_status: Callable[[PushStatus], None] | None = None,
+        on_progress: Callable[[GitProgress], None] | None = None,
+    ):
+        self.config = config
+        self.output = output
+        self.messages = config.messages
+        self.pull = pull
+        self.push = push
+        self.on_push_status = on_push_status
+        self.on_progress = on_progress
+        self.stage = TransformStage(config.transform_cache)
+        self.push_statuses: list[PushStatus] = []
+        self.push_groups: list[PushGroup] = []
+        self.results: dict[Path, ProcessResult] = {}
+        self._syncs: dict[Path, asyncio.Task] = {}
+        self._locked: list[Path] = []
+        self._done = 0
+        self._total = 0
+
+    def _git(self, dest: Destination) -> AsyncGitRepo:
+        # 拉取进度与 origin 推送目标同名
+        progress = relabel(self.on_progress, dest.push_targets[0].name)
+        return AsyncGitRepo(dest.repo, self.messages, dest.token, progress)
+
+    async def plan(
+        self, files: list[Path], hashes: dict[Path, str] | None = None
+    ) -> list[Plan]:
+        """解析文件名，启动各目标仓库的同步并把变换提交到进程池
+
+        不在这里读取文件内容：哈希只在目标文件已存在时才需要（见 _place）
+        """
+        plans = [self._parse(f) for f in files]
+        if hashes:
+            # 调用方已在写入文件时计算过哈希
+            plans = [p._replace(sha256=hashes.get(p.file_path, "")) for p in plans]
+        # 按调度顺序提交变换，小文件和高优先级规则的结果先就绪
+        for plan in sorted((p for p in plans if p.valid), key=_schedule_key):
+            self._start_sync(plan.destination)
+            if plan.parsed["transforms"]:
+                self.stage.submit(plan.file_path, plan.parsed["transforms"])
+        return plans
+
+    def _parse(self, file_path: Path) -> Plan:
+        config = self.config
+        parsed = parse_filename(
+            file_path.name, config.ordered_naming_rules, config.rule_stats
+        )
+        if not parsed:
+            return Plan(file_path, error=filename_error(file_path, config))
+        try:
+            dest, target_path = resolve_target(parsed, config)
+        except ProcessError as e:
+            return Plan(file_path, parsed, error=str(e))
+        return Plan(
+            file_path,
+            parsed,
+            target_path,
+            destination=dest,
+            size=file_path.stat().st_size,
+        )
+
+    def _start_sync(self, dest: Destination):
+        if dest.repo not in self._syncs:
+            self._syncs[dest.repo] = asyncio.create_task(self._sync(dest))
+
+    async def _sync(self, dest: Destination):
+        await repo_lock(dest.repo).acquire()
+        self._locked.append(dest.repo)
+
+        git = self._git(dest)
+        if not git.exists():
+            raise GitError(self.messages.t("process.repo_not_exists"))
+        if self.pull:
+            await git.pull()
+        await asyncio.to_thread(
+            prepare_repo, self.config, git.repo, self.output, dest.asset_root
+        )
+
+    async def sync(self):
+        """等待所有已启动的仓库同步完成"""
+        await asyncio.gather(*self._syncs.values())
+
+    def reject(self, plan: Plan) -> ProcessResult:
+        move_to_failed(plan.file_path, self.config)
+        result = self.results[plan.file_path] = ProcessResult(False, plan.error)
+        return result
+
+    async def run(self, plans: list[Plan]) -> tuple[int, int]:
+        """按目标仓库拆分，各仓库并行处理，总耗时取决于最慢的仓库"""
+        groups: dict[Destination, list[Plan]] = {}
+        for plan in plans:
+            groups.setdefault(plan.destination, []).append(plan)
+
+        self._done, self._total = 0, len(plans)
+        results = await asyncio.gather(
+            *(self._run_destination(dest, group) for dest, group in groups.items())
+        )
+        return sum(r[0] for r in results), sum(r[1] for r in results)
+
+    async def _run_destination(
+        self, dest: Destination, plans: list[Plan]
+    ) -> tuple[int, int]:
+        """小文件作为快速通道先提交并推送，大文件随后逐个提交"""
+        self._start_sync(dest)
+        await self._syncs[dest.repo]
+
+        git = self._git(dest)
+        fast, large = schedule(plans, self.config.fast_lane_bytes)
+        batches = ([fast] if fast else []) + [[p] for p in large]
+        if fast and large:
+            self.output(
+                self.messages.t(
+                    "process.fast_lane",
+                    count=len(fast),
+                    mb=self.config.fast_lane_bytes / (1024 * 1024),
+                )
+            )
+
+        success = failed = unpushed = 0
+        for i, batch in enumerate(batches):
+            batch_success, batch_failed = await self._run_batch(git, batch)
+            success += batch_success
+            failed += batch_failed
+            unpushed += batch_success
+            if self.push and unpushed and i < len(batches) - 1:
+                # 中间批次只推送必需的远程，镜像在最后统一推送
+                await self._push(dest, required_only=True)
+                unpushed = 0
+
+        if self.push and success:
+            await self._push(dest)
+        self._release(dest)
+        return success, failed
+
+    async def _run_batch(self, git: AsyncGitRepo, plans: list[Plan]) -> tuple[int, int]:
+        """下一个文件的变换和移动与当前文件的 git 提交并行执行
+
+        目标路径相同的文件必须等前一个提交完成后才能移动，否则会覆盖尚未提交的内容
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+        committing: dict[Path, asyncio.Event] = {}
+        counts = [0, 0]
+
+        async def place():
+            for plan in plans:
+                await queue.put((plan, await self._place(plan, committing)))
+            await queue.put(None)
+
+        async def commit():
+            while (entry := await queue.get()) is not None:
+                plan, placed = entry
+                self._done += 1
+                self.output(
+                    self.messages.t(
+                        "process.processing",
+                        current=self._done,
+                        total=self._total,
+                        filename=plan.file_path.name,
+                    )
+                )
+                result = await self._commit(git, plan, placed)
+                if not isinstance(placed, ProcessResult):
+                    for path in placed_paths(*placed):
+                        committing.pop(path).set()
+                self.results[plan.file_path] = result
+                if not result.success:
+                    self.output(result.message)
+                counts[0 if result.success else 1] += 1
+
+        await asyncio.gather(place(), commit())
+        return counts[0], counts[1]
+
+    async def _place(self, plan: Plan, committing: dict[Path, asyncio.Event]):
+        target_path = plan.target_path
+        transformed = None
+        if plan.parsed["transforms"]:
+            try:
+                future = self.stage.submit(plan.file_path, plan.parsed["transforms"])
+                transformed = await asyncio.wrap_future(future)
+            except Exception as e:
+                move_to_failed(plan.file_path, self.config)
+                return ProcessResult(
+                    False, self.messages.t("process.transform_failed", error=str(e))
+                )
+            _, target_path = resolve_target(
+                plan.parsed, self.config, transformed.path.name
+            )
+
+        paths = placed_paths(target_path, transformed)
+        for path in paths:
+            if path in committing:
+                await committing[path].wait()
+        if not transformed and target_path.is_file():
+            # 与仓库中的文件完全相同时无需提交
+            sha256 = plan.sha256 or await asyncio.to_thread(file_sha256, plan.file_path)
+            if await asyncio.to_thread(file_sha256, target_path) == sha256:
+                plan.file_path.unlink()
+                return ProcessResult(
+                    True, self.messages.t("process.unchanged"), target_path
+                )
+
+        await asyncio.to_thread(place_file, plan.file_path, target_path, transformed)
+        event = asyncio.Event()
+        for path in paths:
+            committing[path] = event
+        return target_path, transformed
+
+    async def _commit(self, git: AsyncGitRepo, plan: Plan, placed) -> ProcessResult:
+        if isinstance(placed, ProcessResult):
+            if placed.success:
+                self.output(placed.message)
+            return placed
+
+        target_path, transformed = placed
+        if transformed:
+            report_transforms(transformed, self.output, self.messages)
+        try:
+            for path in placed_paths(target_path, transformed):
+                await git.add(path)
+            await git.commit(
+                self.config.git_commit_template.format(**plan.parsed["groups"])
+            )
+        except GitError as e:
+            return rollback_file(
+                plan.file_path, target_path, transformed, self.config, e
+            )
+        return finish_file(
+            plan.file_path,
+            target_path,
+            transformed,
+            self.config,
+            self.output,
+            plan.destination.repo,
+        )
+
+    async def _push(self, dest: Destination, required_only: bool = False):
+        self.output(self.messages.t("process.pushing"))
+        group = PushGroup(
+            dest.repo,
+            self.messages,
+            [t for t in dest.push_targets if t.required or not required_only],
+            dest.branch,
+            on_status=self.on_push_status,
+            on_progress=self.on_progress,
+        )
+        self.push_groups.append(group)
+        self.push_statuses += await asyncio.to_thread(group.start().wait_required)
+
+    @property
+    def push_pending(self) -> list[PushTarget]:
+        return [t for group in self.push_groups for t in group.pending]
+
+    def _release(self, dest: Destination):
+        if dest.repo in self._locked:
+            self._locked.remove(dest.repo)
+            repo_lock(dest.repo).release()
+
+    def close(self):
+        self.stage.close()
+        prune_cache(self.config.transform_cache, self.config.transform_cache_days)
+        self.config.rule_stats.save()
+
+    async def __aenter__(self) -> "Pipeline":
+        return self
+
+    async def __aexit__(self, *exc):
+        for task in self._syncs.values():
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*self._syncs.values(), return_exceptions=True)
+        for repo_path in list(self._locked):
+            self._locked.remove(repo_path)
+            repo_lock(repo_path).release()
+        await asyncio.to_thread(self.close)
+
+
+async def process_batch_async(
+    files: list[Path], config: Config, output: Callable[[str], None] = print
+) -> tuple[int, int]:
+    """process_batch 的可等待版本：规划、变换并逐个提交，不拉取也不推送"""
+    async with Pipeline(config, output, pull=False) as pipeline:
+        plans = await pipeline.plan(files)
+        try:
+            await pipeline.sync()
+        except GitError as e:
+            output(str(e))
+            return 0, len(files)
+        return await _run_plans(pipeline, plans)
+
+
+async def process_async(
+    config: Config,
+    files: list[Path] | None = None,
+    output: Callable[[str], None] = print,
+    push: bool = True,
+    on_progress: Callable[[GitProgress], None] | None = None,
+) -> tuple[int, int]:
+    """完整的 process 流程：拉取的同时规划 inbox，提交后推送到所有必需远程
+
+    未指定 files 时处理整个 inbox，与 CLI 一样只报告不合法的文件而不移动它们
+    """
+    move_invalid = files is not None
+    if files is None:
+        files = config.inbox_files()
+    if not files:
+        return 0, 0
+
+    async with Pipeline(config, output, push=push, on_progress=on_progress) as pipeline:
+        plans = await pipeline.plan(files)
+        await pipeline.sync()
+        success, failed = await _run_plans(pipeline, plans, move_invalid)
+
+    failures = [s for s in pipeline.push_statuses if not s.success]
+    if failures:
+        raise GitError(
+            config.messages.t("process.push_failed", error=failures[0].error)
+        )
+    return success, failed
+
+
+async def _run_plans(
+    pipeline: Pipeline, plans: list[Plan], move_invalid: bool = True
+) -> tuple[int, int]:
+    failed = 0
+    for plan in plans:
+        if not plan.valid:
+            if move_invalid:
+                pipeline.output(pipeline.reject(plan).message)
+            else:
+                pipeline.output(plan.error)
+            failed += 1
+    success, run_failed = await pipeline.run([p for p in plans if p.valid])
+    return success, failed + run_failed
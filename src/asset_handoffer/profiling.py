@@ -0,0 +1,109 @@
+import cProfile
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator
+
+from .git import GitRepo
+
+
+class StackSampler(threading.Thread):
+    """定时采样所有线程的调用栈，输出 collapsed stack 格式（可生成火焰图）"""
+
+    def __init__(self, interval: float = 0.005):
+        super().__init__(name="asset-handoffer-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        names = {}
+        while not self._stopped.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                if ident not in names:
+                    thread = next(
+                        (t for t in threading.enumerate() if t.ident == ident), None
+                    )
+                    names[ident] = thread.name if thread else str(ident)
+                self.stacks[self._collapse(names[ident], frame)] += 1
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{Path(code.co_filename).name}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join([thread_name] + parts[::-1])
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class GitTimer:
+    """统计 GitRepo._run 中各 git 子命令的墙钟时间"""
+
+    def __init__(self):
+        self.calls: Counter[str] = Counter()
+        self.seconds: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, args: list, seconds: float):
+        command = str(args[0]) if args else "git"
+        with self._lock:
+            self.calls[command] += 1
+            self.seconds[command] += seconds
+
+    @property
+    def total(self) -> float:
+        return sum(self.seconds.values())
+
+
+@contextmanager
+def profile_run(
+    name: str, directory: Path, output: Callable[[str], None] = print
+) -> Iterator[None]:
+    """记录 cProfile、采样调用栈和 git 子进程耗时，保存到 directory"""
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = directory / f"{name}-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    timer = GitTimer()
+    sampler = StackSampler()
+    profiler = cProfile.Profile()
+
+    GitRepo.run_hook = timer.record
+    sampler.start()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        wall = time.perf_counter() - start
+        sampler.stop()
+        GitRepo.run_hook = None
+
+        profiler.dump_stats(str(stem.with_suffix(".pstats")))
+        stem.with_suffix(".collapsed").write_text(sampler.collapsed(), encoding="utf-8")
+
+        lines = [f"wall {wall:.3f}s", f"git {timer.total:.3f}s"]
+        for command, seconds in timer.seconds.most_common():
+            lines.append(
+                f"  git {command}: {timer.calls[command]} calls, {seconds:.3f}s"
+            )
+        stem.with_suffix(".txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        for line in lines:
+            output(line)
+        output(f"{stem}.pstats")
+        output(f"{stem}.collapsed")
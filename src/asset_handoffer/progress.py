@@ -0,0 +1,200 @@
+import re
+import shutil
+import sys
+import threading
+import time
+from typing import Callable, NamedTuple, TextIO
+
+UNITS = {"bytes": 1, "KiB": 1024, "MiB": 1024**2, "GiB": 1024**3}
+
+# 例如 "Writing objects:  45% (9/20), 1.20 MiB | 2.40 MiB/s"
+# 或 "remote: Enumerating objects: 5, done."
+PROGRESS_RE = re.compile(
+    r"^(?:remote: )?(?P<phase>[A-Za-z][A-Za-z ]*):\s+"
+    r"(?:(?P<percent>\d+)% \((?P<current>\d+)/(?P<total>\d+)\)|(?P<count>\d+))"
+    r"(?:, (?P<size>[\d.]+) (?P<unit>bytes|[KMG]iB)"
+    r"(?: \| (?P<rate>[\d.]+) (?P<rate_unit>bytes|[KMG]iB)/s)?)?"
+    r"(?P<done>, done)?"
+)
+
+
+class GitProgress(NamedTuple):
+    label: str
+    phase: str
+    current: int
+    total: int | None = None
+    bytes: int = 0
+    throughput: float = 0.0
+    eta: float | None = None
+    done: bool = False
+
+    @property
+    def percent(self) -> float | None:
+        return self.current * 100 / self.total if self.total else None
+
+
+class ProgressParser:
+    """解析 git --progress 的 stderr，\\r 刷新的行转换为进度事件，其余行保留为 stderr 文本"""
+
+    def __init__(self, label: str, callback: Callable[[GitProgress], None]):
+        self.label = label
+        self.callback = callback
+        self.lines: list[str] = []
+        self._partial = ""
+        self._phase = ""
+        self._started = 0.0
+
+    def feed(self, text: str):
+        parts = re.split(r"([\r\n])", self._partial + text)
+        self._partial = parts.pop()
+        for segment, sep in zip(parts[::2], parts[1::2]):
+            self._segment(segment, sep == "\n")
+
+    def close(self):
+        if self._partial:
+            self._segment(self._partial, True)
+            self._partial = ""
+
+    @property
+    def text(self) -> str:
+        return "".join(line + "\n" for line in self.lines)
+
+    def _segment(self, segment: str, final: bool):
+        if final and segment:
+            self.lines.append(segment)
+        event = self._parse(segment.strip())
+        if event:
+            self.callback(event)
+
+    def _parse(self, line: str) -> GitProgress | None:
+        match = PROGRESS_RE.match(line)
+        if not match:
+            return None
+
+        now = time.monotonic()
+        phase = match["phase"]
+        if phase != self._phase:
+            self._phase, self._started = phase, now
+        elapsed = now - self._started
+
+        if match["percent"]:
+            current, total = int(match["current"]), int(match["total"])
+        else:
+            current, total = int(match["count"]), None
+        size = _to_bytes(match["size"], match["unit"])
+        if match["rate"]:
+            rate = float(_to_bytes(match["rate"], match["rate_unit"]))
+        else:
+            rate = size / elapsed if size and elapsed > 0 else 0.0
+
+        eta = None
+        if total and 0 < current < total and not match["done"]:
+            if size and rate:
+                # 按已传输对象的平均大小估算剩余字节
+                eta = (size * total / current - size) / rate
+            elif elapsed > 0:
+                eta = elapsed * (total - current) / current
+
+        return GitProgress(
+            self.label, phase, current, total, size, rate, eta, bool(match["done"])
+        )
+
+
+def relabel(
+    callback: Callable[[GitProgress], None] | None, label: str
+) -> Callable[[GitProgress], None] | None:
+    """以指定标签转发进度事件"""
+    if callback is None:
+        return None
+    return lambda event: callback(event._replace(label=label))
+
+
+def _to_bytes(value: str | None, unit: str | None) -> int:
+    if not value:
+        return 0
+    return int(float(value) * UNITS[unit])
+
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GiB"
+
+
+def format_progress(event: GitProgress) -> str:
+    text = f"{event.label}: {event.phase}"
+    if event.total:
+        text += f" {event.percent:3.0f}% ({event.current}/{event.total})"
+    else:
+        text += f" {event.current}"
+    if event.bytes:
+        text += f", {format_bytes(event.bytes)}"
+    if event.throughput:
+        text += f" | {format_bytes(event.throughput)}/s"
+    if event.eta is not None:
+        text += f", ETA {event.eta:.0f}s"
+    if event.done:
+        text += ", done"
+    return text
+
+
+class ProgressDisplay:
+    """在终端中单行刷新所有进行中的 git 传输；非终端只输出传输阶段的完成行"""
+
+    def __init__(self, stream: TextIO | None = None, interval: float = 0.1):
+        self.stream = stream or sys.stderr
+        self.live = self.stream.isatty()
+        self.interval = interval
+        self._active: dict[str, GitProgress] = {}
+        self._lock = threading.Lock()
+        self._drawn = 0
+        self._last = 0.0
+
+    def update(self, event: GitProgress):
+        with self._lock:
+            if event.done:
+                self._active.pop(event.label, None)
+                if event.bytes:
+                    self._clear()
+                    self.stream.write(format_progress(event) + "\n")
+            else:
+                self._active[event.label] = event
+            if not self.live:
+                self.stream.flush()
+                return
+
+            now = time.monotonic()
+            if not event.done and now - self._last < self.interval:
+                return
+            self._last = now
+            self._draw(" | ".join(format_progress(e) for e in self._active.values()))
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def wrap(self, output: Callable[..., None]) -> Callable[..., None]:
+        """返回先擦除进度行再输出的函数，避免进度行与普通输出混在一行"""
+
+        def echo(*args, **kwargs):
+            self.clear()
+            output(*args, **kwargs)
+
+        return echo
+
+    def _draw(self, line: str):
+        width = shutil.get_terminal_size().columns - 1
+        line = line[:width]
+        self.stream.write("\r" + line + " " * max(self._drawn - len(line), 0))
+        if not line:
+            self.stream.write("\r")
+        self._drawn = len(line)
+        self.stream.flush()
+
+    def _clear(self):
+        if self._drawn:
+            self.stream.write("\r" + " " * self._drawn + "\r")
+            self.stream.flush()
+            self._drawn = 0
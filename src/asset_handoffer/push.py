@@ -0,0 +1,91 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+from .git import GitError, GitRepo
+from .i18n import Messages
+from .progress import GitProgress, relabel
+
+RETRY_DELAY = 2.0
+
+
+class PushTarget(NamedTuple):
+    name: str
+    remote: str
+    required: bool = True
+    retries: int = 0
+    token: str | None = ""
+
+
+class PushStatus(NamedTuple):
+    target: PushTarget
+    success: bool
+    attempts: int
+    seconds: float
+    error: str = ""
+
+
+def push_target(repo: GitRepo, target: PushTarget, branch: str) -> PushStatus:
+    start = time.perf_counter()
+    error = ""
+    for attempt in range(1, target.retries + 2):
+        try:
+            repo.push(branch, target.remote)
+            return PushStatus(target, True, attempt, time.perf_counter() - start)
+        except GitError as e:
+            error = str(e)
+            if attempt <= target.retries:
+                time.sleep(RETRY_DELAY * attempt)
+    return PushStatus(target, False, attempt, time.perf_counter() - start, error)
+
+
+class PushGroup:
+    """并行推送到 origin 和所有镜像，必需的远程完成后即可返回"""
+
+    def __init__(
+        self,
+        repo_path: Path,
+        messages: Messages,
+        targets: list[PushTarget],
+        branch: str,
+        on_status: Callable[[PushStatus], None] | None = None,
+        on_progress: Callable[[GitProgress], None] | None = None,
+    ):
+        self.repo_path = repo_path
+        self.messages = messages
+        self.targets = targets
+        self.branch = branch
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self._futures: dict[PushTarget, Future] = {}
+
+    def start(self) -> "PushGroup":
+        executor = ThreadPoolExecutor(max_workers=max(len(self.targets), 1))
+        for target in self.targets:
+            self._futures[target] = executor.submit(self._push, target)
+        # 不等待可选镜像，线程在后台继续执行
+        executor.shutdown(wait=False)
+        return self
+
+    def _push(self, target: PushTarget) -> PushStatus:
+        # 以远程名称标记进度，便于区分并行的推送
+        progress = relabel(self.on_progress, target.name)
+        repo = GitRepo(self.repo_path, self.messages, target.token, progress)
+        status = push_target(repo, target, self.branch)
+        if self.on_status:
+            self.on_status(status)
+        return status
+
+    def wait_required(self) -> list[PushStatus]:
+        required = [f for t, f in self._futures.items() if t.required]
+        wait(required)
+        return [f.result() for f in required]
+
+    def wait_all(self) -> list[PushStatus]:
+        wait(self._futures.values())
+        return [f.result() for f in self._futures.values()]
+
+    @property
+    def pending(self) -> list[PushTarget]:
+        return [t for t, f in self._futures.items() if not f.done()]
@@ -0,0 +1,175 @@
+import json
+import re
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+class RuleTrial(NamedTuple):
+    index: int
+    rule: dict
+    matched: bool
+    seconds: float
+
+
+class RuleStats:
+    """命名规则的命中统计，按 pattern 持久化到 JSON 文件"""
+
+    def __init__(self, path: Path | None = None):
+        self.path = path
+        self.rules: dict[str, dict] = {}
+        self._order_cache: tuple[tuple, list[dict]] | None = None
+
+    @staticmethod
+    def load(path: Path) -> "RuleStats":
+        stats = RuleStats(path)
+        try:
+            stats.rules = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            pass
+        return stats
+
+    def save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self.rules, indent=2), encoding="utf-8")
+
+    def record(self, pattern: str, matched: bool, seconds: float):
+        entry = self.rules.setdefault(pattern, {"hits": 0, "misses": 0, "seconds": 0.0})
+        entry["hits" if matched else "misses"] += 1
+        entry["seconds"] += seconds
+
+    def hits(self, pattern: str) -> int:
+        return self.rules.get(pattern, {}).get("hits", 0)
+
+    def ordered(self, rules: list[dict]) -> list[dict]:
+        """按命中次数重排规则，只交换可证明不相交的规则，匹配结果不变"""
+        key = tuple(
+            (r.get("pattern", ""), self.hits(r.get("pattern", ""))) for r in rules
+        )
+        if self._order_cache and self._order_cache[0] == key:
+            return self._order_cache[1]
+
+        result: list[dict] = []
+        for rule in rules:
+            pos = len(result)
+            while (
+                pos > 0
+                and self.hits(rule.get("pattern", ""))
+                > self.hits(result[pos - 1].get("pattern", ""))
+                and rules_disjoint(rule, result[pos - 1])
+            ):
+                pos -= 1
+            result.insert(pos, rule)
+
+        self._order_cache = (key, result)
+        return result
+
+
+def explain_filename(filename: str, rules: list[dict]) -> list[RuleTrial]:
+    """按顺序尝试每条规则，直到命中为止"""
+    trials = []
+    for i, rule in enumerate(rules):
+        start = time.perf_counter()
+        matched = _rule_matches(rule, filename)
+        trials.append(RuleTrial(i, rule, matched, time.perf_counter() - start))
+        if matched:
+            break
+    return trials
+
+
+def _rule_matches(rule: dict, filename: str) -> bool:
+    try:
+        match = re.match(rule.get("pattern", ""), filename)
+    except re.error:
+        return False
+    if not match:
+        return False
+    groups = match.groupdict()
+    return "ext" in groups or "extension" in groups
+
+
+def rules_disjoint(a: dict, b: dict) -> bool:
+    """证明不存在同时匹配两条规则的文件名（保守：无法证明时返回 False）"""
+    pa = _literal_bounds(a.get("pattern", ""))
+    pb = _literal_bounds(b.get("pattern", ""))
+    if pa is None or pb is None:
+        # 无效的正则永远不会命中
+        return True
+
+    prefix_a, endings_a = pa
+    prefix_b, endings_b = pb
+    if not (prefix_a.startswith(prefix_b) or prefix_b.startswith(prefix_a)):
+        return True
+    if endings_a and endings_b:
+        return not any(
+            x.endswith(y) or y.endswith(x) for x in endings_a for y in endings_b
+        )
+    return False
+
+
+def _literal_bounds(pattern: str) -> tuple[str, list[str]] | None:
+    """提取必需的字面前缀和可能的结尾（仅当以 $ 或 \\Z 锚定时）"""
+    try:
+        compiled = re.compile(pattern)
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+    # IGNORECASE 使字面量不再唯一；MULTILINE 使 $ 也能在任意换行符前匹配
+    unsafe = re.IGNORECASE | re.MULTILINE
+    if compiled.flags & unsafe or _scoped_flags(parsed) & unsafe:
+        return "", []
+
+    items = list(parsed)
+    prefix, _ = _literal_run(items)
+
+    endings: list[str] = []
+    if items and items[-1][0] is sre_parse.AT:
+        at = items[-1][1]
+        suffix, _ = _literal_run(items[:-1], reverse=True)
+        if at is sre_parse.AT_END_STRING:
+            endings = [suffix]
+        elif at is sre_parse.AT_END:
+            # $ 也匹配末尾换行符之前的位置
+            endings = [suffix, suffix + "\n"]
+    return prefix, endings
+
+
+def _scoped_flags(node) -> int:
+    """收集 (?i:...) 这类局部标志"""
+    flags = 0
+    if isinstance(node, sre_parse.SubPattern):
+        node = node.data
+    if isinstance(node, (list, tuple)):
+        if len(node) == 2 and node[0] is sre_parse.SUBPATTERN:
+            flags |= node[1][1]
+        for item in node:
+            flags |= _scoped_flags(item)
+    return flags
+
+
+def _literal_run(items: list, reverse: bool = False) -> tuple[str, bool]:
+    """返回必需的字面前缀（reverse 时为后缀），以及整段是否都是字面量"""
+    chars = []
+    complete = True
+    for op, av in reversed(items) if reverse else items:
+        if op is sre_parse.LITERAL:
+            chars.append(chr(av))
+        elif op is sre_parse.AT and av is sre_parse.AT_BEGINNING and not reverse:
+            continue
+        elif op is sre_parse.SUBPATTERN and not (av[1] & re.IGNORECASE):
+            run, complete = _literal_run(list(av[-1]), reverse)
+            chars.append(run[::-1] if reverse else run)
+            if not complete:
+                break
+        else:
+            complete = False
+            break
+    text = "".join(chars)
+    return (text[::-1] if reverse else text), complete
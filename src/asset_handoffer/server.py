@@ -0,0 +1,356 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterator
+from urllib.parse import unquote, urlsplit
+
+from .core import (
+    Config,
+    Destination,
+    ProcessError,
+    ProcessResult,
+    filename_error,
+    move_to_failed,
+    parse_filename,
+    resolve_target,
+)
+from .pipeline import Pipeline
+from .push import PushStatus
+
+# 每次从连接读取并写入磁盘的块大小，单个上传的内存占用不随文件大小增长
+CHUNK_SIZE = 1024 * 1024
+
+
+class ChecksumError(ValueError):
+    pass
+
+
+class Upload:
+    def __init__(self, path: Path, sha256: str, size: int):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.result: ProcessResult | None = None
+        self.error = ""
+        self.done = threading.Event()
+
+
+class Batcher(threading.Thread):
+    """收集上传完成的文件，按时间窗口组成小批次送入处理流水线"""
+
+    def __init__(
+        self,
+        config: Config,
+        output: Callable[[str], None] = print,
+        window: float = 2.0,
+        max_batch: int = 32,
+        on_push_status: Callable[[PushStatus], None] | None = None,
+    ):
+        super().__init__(name="asset-handoffer-batcher", daemon=True)
+        self.config = config
+        self.output = output
+        self.window = window
+        self.max_batch = max_batch
+        self.on_push_status = on_push_status
+        self._queue: queue.Queue[Upload | None] = queue.Queue()
+        self._reserved: set[str] = set()
+        self._lock = threading.Lock()
+
+    def reserve(self, filename: str) -> bool:
+        """同名文件在处理完成前只接受一个上传"""
+        with self._lock:
+            if filename in self._reserved or (self.config.inbox / filename).exists():
+                return False
+            self._reserved.add(filename)
+            return True
+
+    def release(self, filename: str):
+        with self._lock:
+            self._reserved.discard(filename)
+
+    def submit(self, upload: Upload):
+        self._queue.put(upload)
+
+    def stop(self):
+        self._queue.put(None)
+        self.join()
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    upload = self._queue.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    )
+                except queue.Empty:
+                    break
+                if upload is None:
+                    stopping = True
+                    break
+                batch.append(upload)
+            self._process(batch)
+
+    def _process(self, batch: list[Upload]):
+        m = self.config.messages
+        self.output(m.t("serve.batch", count=len(batch)))
+        try:
+            results, push_error = asyncio.run(self._run(batch))
+        except Exception as e:
+            # 同步失败时文件不会被提交，移到 failed 以便客户端重新上传
+            results, push_error = {}, ""
+            for upload in batch:
+                move_to_failed(upload.path, self.config)
+                upload.error = str(e)
+            self.output(str(e))
+
+        for upload in batch:
+            upload.result = results.get(upload.path)
+            if upload.result and upload.result.success and push_error:
+                upload.error = push_error
+            self.release(upload.path.name)
+            upload.done.set()
+
+    async def _run(self, batch: list[Upload]) -> tuple[dict[Path, ProcessResult], str]:
+        async with Pipeline(
+            self.config,
+            self.output,
+            push=True,
+            on_push_status=self.on_push_status,
+        ) as pipeline:
+            plans = await pipeline.plan(
+                [u.path for u in batch], {u.path: u.sha256 for u in batch}
+            )
+            await pipeline.sync()
+            for plan in plans:
+                if not plan.valid:
+                    self.output(pipeline.reject(plan).message)
+            await pipeline.run([p for p in plans if p.valid])
+
+        failures = [s for s in pipeline.push_statuses if not s.success]
+        push_error = ""
+        if failures:
+            push_error = self.config.messages.t(
+                "process.push_failed", error=failures[0].error
+            )
+        return pipeline.results, push_error
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    """PUT /<文件名>：先校验文件名，再流式写入磁盘并计算哈希"""
+
+    protocol_version = "HTTP/1.1"
+    server: "IngestServer"
+
+    def handle_expect_100(self) -> bool:
+        # 客户端发送 Expect: 100-continue 时，文件名不合法则无需传输文件内容
+        if self.command == "PUT" and not self._accept():
+            return False
+        return super().handle_expect_100()
+
+    def do_PUT(self):
+        accepted = self._accept()
+        if not accepted:
+            return
+        filename, dest = accepted
+
+        config = self.server.config
+        m = config.messages
+        batcher = self.server.batcher
+        if not batcher.reserve(filename):
+            self._reply(409, {"error": m.t("serve.conflict", filename=filename)})
+            return
+
+        try:
+            upload = self._receive(filename)
+        except ChecksumError:
+            batcher.release(filename)
+            self._reply(400, {"error": m.t("serve.checksum_mismatch")})
+            return
+        except Exception as e:
+            batcher.release(filename)
+            self._reply(400, {"error": m.t("serve.incomplete", error=str(e))})
+            return
+
+        self.server.output(
+            m.t(
+                "serve.received",
+                filename=filename,
+                size=upload.size / (1024 * 1024),
+                sha256=upload.sha256[:12],
+            )
+        )
+        batcher.submit(upload)
+        upload.done.wait()
+
+        body = {"filename": filename, "sha256": upload.sha256, "size": upload.size}
+        result = upload.result
+        if result is None:
+            self._reply(503, {**body, "error": upload.error})
+        elif not result.success:
+            self._reply(422, {**body, "error": result.message})
+        else:
+            if result.target_path:
+                body["target"] = result.target_path.relative_to(dest.repo).as_posix()
+            if upload.error:
+                body["error"] = upload.error
+            self._reply(201, body)
+
+    def _accept(self) -> tuple[str, Destination] | None:
+        """在读取请求体之前检查令牌、文件名和长度，不通过时直接回复错误"""
+        config = self.server.config
+        m = config.messages
+
+        token = self.server.token
+        auth = self.headers.get("Authorization", "")
+        if token and not hmac.compare_digest(
+            auth.encode("utf-8"), f"Bearer {token}".encode("utf-8")
+        ):
+            self._reply(401, {"error": m.t("serve.unauthorized")})
+            return None
+
+        filename = unquote(urlsplit(self.path).path).lstrip("/")
+        if not filename or "/" in filename or "\\" in filename or filename[0] == ".":
+            self._reply(400, {"error": m.t("serve.invalid_name", filename=filename)})
+            return None
+
+        parsed = parse_filename(filename, config.ordered_naming_rules)
+        if not parsed:
+            self._reply(422, {"error": filename_error(Path(filename), config)})
+            return None
+        try:
+            dest, _ = resolve_target(parsed, config)
+        except ProcessError as e:
+            self._reply(422, {"error": str(e)})
+            return None
+
+        chunked = "chunked" in self.headers.get("Transfer-Encoding", "").lower()
+        if not chunked and self.headers.get("Content-Length") is None:
+            self._reply(411, {"error": m.t("serve.length_required")})
+            return None
+        return filename, dest
+
+    def _receive(self, filename: str) -> Upload:
+        """边读边写边计算 sha256，校验通过后才原子移动到 inbox"""
+        config = self.server.config
+        upload_dir = config.workspace_root / ".uploads"
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        part = upload_dir / f"{uuid.uuid4().hex}.part"
+
+        h = hashlib.sha256()
+        size = 0
+        try:
+            with open(part, "wb") as f:
+                for chunk in self._body():
+                    h.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            sha256 = h.hexdigest()
+            # 在 .uploads 中校验，损坏的文件不会出现在 inbox 中被其他进程提交
+            expected = self.headers.get("X-Content-SHA256", "").lower()
+            if expected and not hmac.compare_digest(
+                expected.encode("utf-8"), sha256.encode("utf-8")
+            ):
+                raise ChecksumError(expected)
+            target = config.inbox / filename
+            os.replace(part, target)
+        except BaseException:
+            part.unlink(missing_ok=True)
+            raise
+        return Upload(target, sha256, size)
+
+    def _body(self) -> Iterator[bytes]:
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            yield from self._chunked_body()
+            return
+
+        remaining = int(self.headers["Content-Length"])
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, CHUNK_SIZE))
+            if not chunk:
+                raise ValueError(f"{remaining} bytes missing")
+            remaining -= len(chunk)
+            yield chunk
+
+    def _chunked_body(self) -> Iterator[bytes]:
+        while True:
+            line = self.rfile.readline(1024)
+            size = int(line.split(b";")[0].strip(), 16)
+            if size == 0:
+                # 跳过 trailer，直到空行
+                while self.rfile.readline(1024) not in (b"\r\n", b"\n", b""):
+                    pass
+                return
+            while size > 0:
+                chunk = self.rfile.read(min(size, CHUNK_SIZE))
+                if not chunk:
+                    raise ValueError(f"{size} bytes missing")
+                size -= len(chunk)
+                yield chunk
+            self.rfile.readline(1024)
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        if status >= 400:
+            # 请求体可能尚未读取，不能复用连接
+            self.close_connection = True
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args):
+        self.server.output(f"{self.address_string()} {format % args}")
+
+
+class IngestServer(ThreadingHTTPServer):
+    """接收 HTTP 上传并按小批次提交的本地服务"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        config: Config,
+        host: str | None = None,
+        port: int | None = None,
+        output: Callable[[str], None] = print,
+        on_push_status: Callable[[PushStatus], None] | None = None,
+    ):
+        settings = config.serve_settings
+        self.config = config
+        self.output = output
+        self.token = settings["token"]
+        self.batcher = Batcher(
+            config,
+            output,
+            settings["batch_window"],
+            settings["max_batch"],
+            on_push_status,
+        )
+        super().__init__(
+            (host or settings["host"], settings["port"] if port is None else port),
+            UploadHandler,
+        )
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        self.batcher.start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.batcher.stop()
@@ -0,0 +1,239 @@
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+# 缓存项中存放附加输出的子目录
+EXTRA_DIR = ".extra"
+
+
+class TransformError(Exception):
+    pass
+
+
+class TransformTiming(NamedTuple):
+    name: str
+    seconds: float
+
+
+class TransformResult(NamedTuple):
+    path: Path
+    timings: list[TransformTiming]
+    cached: bool = False
+    # 与资产一起提交到同一目录的附加输出（如校验清单）
+    extras: tuple[Path, ...] = ()
+
+
+def transform_name(spec: str | dict) -> str:
+    if isinstance(spec, dict):
+        return (
+            spec.get("name")
+            or spec.get("function")
+            or str(spec.get("command", ["command"])[0])
+        )
+    return spec
+
+
+def load_transform(spec: str | dict) -> Callable[[Path, Path], Path]:
+    """解析变换配置：`module:function` 导入路径，或 `command` 外部命令
+
+    字典形式可用 `function` 代替 `command`，以便同时设置 `version` 等字段
+    """
+    if isinstance(spec, dict):
+        if spec.get("function"):
+            return load_transform(spec["function"])
+        if not spec.get("command"):
+            raise TransformError(f"Transform missing command: {spec}")
+        return _command_transform(spec)
+
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise TransformError(f"Transform must be 'module:function': {spec}")
+    try:
+        return getattr(importlib.import_module(module_name), attr)
+    except (ImportError, AttributeError) as e:
+        raise TransformError(f"Cannot load transform {spec}: {e}")
+
+
+def output_name(filename: str, specs: list) -> str | None:
+    """按各步骤的 output 推断变换链输出的文件名
+
+    未声明 output 的 Python 函数无法预知输出，返回 None
+    """
+    for spec in specs:
+        if not isinstance(spec, dict):
+            return None
+        if spec.get("function") and not spec.get("output"):
+            return None
+        filename = spec.get("output", "{name}").format(**_fields(Path(filename)))
+    return filename
+
+
+def _fields(src: Path) -> dict:
+    return {"stem": src.stem, "suffix": src.suffix, "name": src.name}
+
+
+def _command_transform(spec: dict) -> Callable[[Path, Path], Path]:
+    def run(src: Path, out_dir: Path) -> Path:
+        fields = _fields(src)
+        dst = out_dir / spec.get("output", "{name}").format(**fields)
+        args = [str(a).format(input=src, output=dst, **fields) for a in spec["command"]]
+        try:
+            subprocess.run(args, check=True, capture_output=True, text=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise TransformError(getattr(e, "stderr", None) or str(e))
+        if not dst.exists():
+            raise TransformError(f"Transform produced no output: {dst.name}")
+        return dst
+
+    return run
+
+
+def cache_key(file_path: Path, specs: list) -> str:
+    """输入内容、变换配置（含可选的 version）和变换代码共同决定缓存项"""
+    h = hashlib.sha256(json.dumps(specs, sort_keys=True).encode("utf-8"))
+    for spec in specs:
+        h.update(_code_fingerprint(spec).encode("utf-8"))
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _code_fingerprint(spec: str | dict) -> str:
+    """Python 函数取所在模块文件的哈希，外部命令取可执行文件的大小和修改时间"""
+    if isinstance(spec, dict) and not spec.get("function"):
+        command = spec.get("command") or [""]
+        exe = shutil.which(str(command[0]))
+        if not exe:
+            return ""
+        stat = os.stat(exe)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    if isinstance(spec, dict):
+        spec = spec["function"]
+    try:
+        origin = importlib.util.find_spec(spec.partition(":")[0]).origin
+        return hashlib.sha256(Path(origin).read_bytes()).hexdigest()
+    except (ImportError, AttributeError, TypeError, ValueError, OSError):
+        return ""
+
+
+def prune_cache(cache_dir: Path, max_age_days: float) -> int:
+    """删除超过 max_age_days 天未使用的缓存项，返回删除数量；0 表示不清理"""
+    if max_age_days <= 0 or not cache_dir.is_dir():
+        return 0
+    cutoff = time.time() - max_age_days * 24 * 3600
+    removed = 0
+    for entry in cache_dir.iterdir():
+        try:
+            if entry.stat().st_mtime >= cutoff:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry)
+            else:
+                entry.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def run_transforms(src: str, specs: list, cache_dir: str) -> TransformResult:
+    """在工作进程中依次执行变换链，结果按输入哈希缓存
+
+    每一步返回一个路径，或路径列表：第一个作为下一步的输入，其余为附加输出
+    """
+    entry = Path(cache_dir) / cache_key(Path(src), specs)
+    if entry.is_dir():
+        # 命中时刷新修改时间，清理只删除长期未使用的缓存项
+        os.utime(entry)
+        return _cached_result(entry, [], True)
+
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    timings = []
+    extras: dict[str, Path] = {}
+    with tempfile.TemporaryDirectory(dir=cache_dir) as tmp:
+        current = Path(src)
+        for i, spec in enumerate(specs):
+            step_dir = Path(tmp) / str(i)
+            step_dir.mkdir()
+            start = time.perf_counter()
+            outputs = load_transform(spec)(current, step_dir)
+            if isinstance(outputs, (list, tuple)):
+                current, *more = [Path(p) for p in outputs]
+                extras.update((p.name, p) for p in more)
+            else:
+                current = Path(outputs)
+            timings.append(
+                TransformTiming(transform_name(spec), time.perf_counter() - start)
+            )
+
+        staging = Path(tmp) / "out"
+        (staging / EXTRA_DIR).mkdir(parents=True)
+        shutil.copy2(current, staging / current.name)
+        for name, path in extras.items():
+            shutil.copy2(path, staging / EXTRA_DIR / name)
+        try:
+            os.replace(staging, entry)
+        except OSError:
+            # 其他进程已写入同一缓存项
+            pass
+
+    return _cached_result(entry, timings)
+
+
+def _cached_result(entry: Path, timings: list, cached: bool = False) -> TransformResult:
+    path = next(p for p in entry.iterdir() if p.is_file())
+    extras = tuple(sorted((entry / EXTRA_DIR).iterdir()))
+    return TransformResult(path, timings, cached, extras)
+
+
+class TransformStage:
+    """提交前的变换阶段，CPU 密集的变换在进程池中并行执行"""
+
+    def __init__(self, cache_dir: Path, max_workers: int | None = None):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers or os.cpu_count()
+        self._executor: ProcessPoolExecutor | None = None
+        self._futures: dict[tuple[Path, str], Future] = {}
+
+    def submit(self, file_path: Path, specs: list) -> Future:
+        key = (file_path, json.dumps(specs, sort_keys=True))
+        if key not in self._futures:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            self._futures[key] = self._executor.submit(
+                run_transforms, str(file_path), specs, str(self.cache_dir)
+            )
+        return self._futures[key]
+
+    def run(self, file_path: Path, specs: list) -> TransformResult:
+        future = self.submit(file_path, specs)
+        try:
+            return future.result()
+        except TransformError:
+            raise
+        except Exception as e:
+            raise TransformError(str(e))
+
+    def close(self):
+        if self._executor is not None:
+            # 用户取消时不再执行排队中的变换，只等待正在运行的
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        self._futures.clear()
+
+    def __enter__(self) -> "TransformStage":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,66 @@
+import subprocess
+
+import pytest
+
+from asset_handoffer import Config, GitRepo
+
+
+def run_git(*args, cwd=None) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    )
+
+
+@pytest.fixture
+def git():
+    return run_git
+
+
+@pytest.fixture
+def make_remote(tmp_path):
+    """创建带一个初始提交的裸仓库，种子克隆位于 <name>-seed"""
+
+    def make(name="remote"):
+        remote = tmp_path / f"{name}.git"
+        run_git("init", "--bare", "-b", "main", str(remote))
+        seed = tmp_path / f"{name}-seed"
+        run_git("clone", str(remote), str(seed))
+        run_git("checkout", "-b", "main", cwd=seed)
+        run_git(
+            "-c",
+            "user.name=t",
+            "-c",
+            "user.email=t@t",
+            "commit",
+            "--allow-empty",
+            "-m",
+            "init",
+            cwd=seed,
+        )
+        run_git("push", "origin", "main", cwd=seed)
+        return remote
+
+    return make
+
+
+@pytest.fixture
+def workspace(tmp_path, make_remote):
+    """已克隆远程仓库的工作区，返回 (config, remote)"""
+    remote = make_remote()
+    config_file = tmp_path / "project.yaml"
+    config_file.write_text(
+        f"""
+git:
+  repository: "{remote.as_posix()}"
+asset_root: "Assets/"
+naming:
+  pattern: "^(?P<type>[^_]+)_(?P<name>[^.]+)\\\\.(?P<ext>\\\\w+)$"
+path_template: "{{type}}/{{name}}.{{ext}}"
+language: "en-US"
+""",
+        encoding="utf-8",
+    )
+    config = Config.load(config_file)
+    config.ensure_dirs()
+    GitRepo(config.repo).clone(str(remote))
+    return config, remote
@@ -3,6 +3,8 @@ from pathlib import Path
 import pytest
 
 from asset_handoffer import Config, parse_filename
+from asset_handoffer.core import resolve_target, write_gitattributes
+from asset_handoffer.git import GitRepo
 
 
 def test_config_create_and_load(tmp_path):
@@ -37,3 +39,116 @@ def test_parse_filename_no_match():
     ]
     result = parse_filename("InvalidName.fbx", rules)
     assert result is None
+
+
+def test_write_gitattributes_managed_block(tmp_path):
+    attributes = tmp_path / ".gitattributes"
+    attributes.write_text("*.txt text\n", encoding="utf-8")
+
+    assert write_gitattributes(attributes, ["fbx", "wav"])
+    assert not write_gitattributes(attributes, ["fbx", "wav"])
+    content = attributes.read_text(encoding="utf-8")
+    assert content.startswith("*.txt text\n")
+    assert "*.[fF][bB][xX] binary -delta" in content
+
+    assert write_gitattributes(attributes, [])
+    assert attributes.read_text(encoding="utf-8") == "*.txt text\n"
+
+
+def test_mirrors_do_not_inherit_origin_token(tmp_path):
+    config_file = tmp_path / "project.yaml"
+    Config.create(
+        git_url="https://github.com/test/test.git",
+        output_file=config_file,
+        token="origin-secret",
+    )
+    config = Config.load(config_file)
+    config.data["git"]["mirrors"] = [
+        "https://backup.local/test.git",
+        {"url": "https://onprem.local/test.git", "token": "onprem-secret"},
+    ]
+
+    tokens = {t.name: t.token for t in config.push_targets}
+    assert tokens == {
+        "origin": "origin-secret",
+        "https://backup.local/test.git": "",
+        "https://onprem.local/test.git": "onprem-secret",
+    }
+
+
+def test_mirrors_ignore_token_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("GIT_TOKEN", "secret")
+    config_file = tmp_path / "project.yaml"
+    Config.create(git_url="https://github.com/test/test.git", output_file=config_file)
+    config = Config.load(config_file)
+    config.data["git"]["mirrors"] = ["https://backup.example.com/a.git"]
+
+    origin, mirror = config.push_targets
+    # origin 未配置令牌时仍使用 GIT_TOKEN，镜像不使用
+    assert GitRepo(tmp_path, token=origin.token).token == "secret"
+    url = "https://backup.example.com/a.git"
+    assert GitRepo(tmp_path, token=mirror.token)._inject_token(url) == url
+
+
+def test_targets_do_not_inherit_origin_token(tmp_path):
+    config_file = tmp_path / "project.yaml"
+    Config.create(
+        git_url="https://github.com/test/test.git",
+        output_file=config_file,
+        token="origin-secret",
+    )
+    config = Config.load(config_file)
+    config.data["git"]["targets"] = {
+        "audio": {"repository": "https://audio.local/audio.git"},
+        "video": {"repository": "https://video.local/video.git", "token": "v"},
+    }
+
+    assert config.destination().token == "origin-secret"
+    assert config.destination("audio").token == ""
+    assert config.destination("video").token == "v"
+    assert config.destination("audio").push_targets[0].token == ""
+
+
+def test_targets_ignore_token_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("GIT_TOKEN", "secret")
+    config_file = tmp_path / "project.yaml"
+    Config.create(git_url="https://github.com/test/test.git", output_file=config_file)
+    config = Config.load(config_file)
+    url = "https://audio.example.com/audio.git"
+    config.data["git"]["targets"] = {"audio": {"repository": url}}
+
+    assert GitRepo(tmp_path, token=config.destination().token).token == "secret"
+    audio = config.destination("audio")
+    assert GitRepo(tmp_path, token=audio.token)._inject_token(url) == url
+    assert GitRepo(tmp_path, token=audio.push_targets[0].token).token == ""
+
+
+def test_resolve_target_uses_transform_output_name(tmp_path):
+    config_file = tmp_path / "project.yaml"
+    Config.create(git_url="https://github.com/test/test.git", output_file=config_file)
+    config = Config.load(config_file)
+    ogg = {"command": ["ffmpeg", "-i", "{input}", "{output}"], "output": "{stem}.ogg"}
+    config.data["naming"] = {
+        "rules": [
+            {
+                "pattern": "^(?P<type>Audio)_(?P<name>[^.]+)\\.(?P<ext>wav)$",
+                "path_template": "{type}/{name}.{ext}",
+                "transforms": [ogg],
+            },
+            {
+                "pattern": "^(?P<type>Tex)_(?P<name>[^.]+)\\.(?P<ext>png)$",
+                "path_template": "{type}/{name}.{ext}",
+                "transforms": [ogg, "my_studio.transforms:unknown"],
+            },
+        ]
+    }
+
+    _, target = resolve_target(
+        parse_filename("Audio_Hit.wav", config.naming_rules), config
+    )
+    assert target.name == "Hit.ogg"
+    # Python 函数的输出文件名无法预知，保留原扩展名
+    _, target = resolve_target(
+        parse_filename("Tex_Wall.png", config.naming_rules), config
+    )
+    assert target.name == "Wall.png"
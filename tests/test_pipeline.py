@@ -0,0 +1,165 @@
+import asyncio
+from pathlib import Path
+
+from asset_handoffer import GitRepo, Plan, process_async, process_batch
+from asset_handoffer import pipeline
+from asset_handoffer.pipeline import Pipeline, schedule
+
+
+def test_process_async_commits_and_pushes(workspace, git):
+    config, remote = workspace
+    (config.inbox / "Character_Hero.fbx").write_bytes(b"hero")
+    (config.inbox / "Prop_Sword.fbx").write_bytes(b"sword")
+    (config.inbox / "Invalid.fbx").write_bytes(b"x")
+
+    files = sorted(f for f in config.inbox.iterdir() if f.suffix == ".fbx")
+    success, failed = asyncio.run(process_async(config, files, output=lambda s: None))
+
+    assert (success, failed) == (2, 1)
+    assert (config.failed / "Invalid.fbx").exists()
+    log = git("log", "--format=%s", "main", cwd=remote).stdout.split("\n")
+    assert "Update: Hero" in log and "Update: Sword" in log
+
+
+def test_process_batch_skips_unchanged_files(workspace, git):
+    config, _ = workspace
+    (config.inbox / "Character_Hero.fbx").write_bytes(b"hero")
+    assert process_batch(
+        [config.inbox / "Character_Hero.fbx"], config, lambda s: None
+    ) == (1, 0)
+
+    (config.inbox / "Character_Hero.fbx").write_bytes(b"hero")
+    assert process_batch(
+        [config.inbox / "Character_Hero.fbx"], config, lambda s: None
+    ) == (1, 0)
+    assert not (config.inbox / "Character_Hero.fbx").exists()
+    assert git("rev-list", "--count", "HEAD", cwd=config.repo).stdout.strip() == "2"
+
+
+def test_process_async_routes_rules_to_targets(tmp_path, workspace, make_remote, git):
+    audio = make_remote("audio")
+    config, remote = workspace
+    config.data["git"]["targets"] = {
+        "audio": {"repository": audio.as_posix(), "asset_root": "Sounds/"}
+    }
+    config.data["naming"] = {
+        "rules": [
+            {
+                "pattern": "^Audio_(?P<name>[^.]+)\\.(?P<ext>wav)$",
+                "path_template": "{name}.{ext}",
+                "target": "audio",
+            },
+            {
+                "pattern": "^Concept_(?P<name>[^.]+)\\.(?P<ext>psd)$",
+                "path_template": "{name}.{ext}",
+                "branch": "review",
+            },
+            {
+                "pattern": "^(?P<type>[^_]+)_(?P<name>[^.]+)\\.(?P<ext>\\w+)$",
+                "path_template": "{type}/{name}.{ext}",
+            },
+        ]
+    }
+    git("push", "origin", "main:review", cwd=tmp_path / "remote-seed")
+    for dest in config.destinations[1:]:
+        dest.repo.parent.mkdir(parents=True, exist_ok=True)
+        GitRepo(dest.repo).clone(dest.url, dest.branch)
+
+    files = [
+        config.inbox / name
+        for name in ("Audio_Hit.wav", "Concept_Hero.psd", "Character_Hero.fbx")
+    ]
+    for f in files:
+        f.write_bytes(f.name.encode())
+    assert asyncio.run(process_async(config, files, output=lambda s: None)) == (3, 0)
+
+    def tree(repo, branch):
+        return git("ls-tree", "-r", "--name-only", branch, cwd=repo).stdout.split()
+
+    assert tree(audio, "main") == ["Sounds/Hit.wav"]
+    assert tree(remote, "review") == ["Assets/Hero.psd"]
+    assert tree(remote, "main") == ["Assets/Character/Hero.fbx"]
+    assert (config.workspace_root / ".repos" / "audio@main").is_dir()
+
+
+def test_schedule_orders_by_priority_and_size():
+    def plan(name, size, priority=0):
+        return Plan(Path(name), {"priority": priority}, Path(name), size=size)
+
+    plans = [plan("video", 2000), plan("b", 20), plan("a", 10), plan("ui", 30, 1)]
+    fast, large = schedule(plans, 100)
+    assert [p.file_path.name for p in fast] == ["ui", "a", "b"]
+    assert [p.file_path.name for p in large] == ["video"]
+
+    fast, large = schedule(plans, 0)
+    assert [p.file_path.name for p in fast] == ["ui", "a", "b", "video"]
+    assert large == []
+
+
+def test_process_async_pushes_fast_lane_first(workspace, git):
+    config, remote = workspace
+    config.data["schedule"] = {"fast_lane_mb": 0.001}
+    files = [config.inbox / "Video_Intro.mp4", config.inbox / "Texture_Grass.png"]
+    files[0].write_bytes(b"v" * 4096)
+    files[1].write_bytes(b"t")
+
+    lines = []
+    assert asyncio.run(process_async(config, files, output=lines.append)) == (2, 0)
+
+    assert any("Fast lane: 1 files" in line for line in lines)
+    assert lines.count(config.messages.t("process.pushing")) == 2
+    log = git("log", "--format=%s", "main", cwd=remote).stdout.splitlines()
+    assert log[:2] == ["Update: Intro", "Update: Grass"]
+
+
+def test_process_async_defaults_to_inbox_without_moving_invalid_files(workspace):
+    config, _ = workspace
+    (config.inbox / "Character_Hero.fbx").write_bytes(b"hero")
+    (config.inbox / "Invalid.fbx").write_bytes(b"x")
+
+    assert asyncio.run(process_async(config, output=lambda s: None)) == (1, 1)
+    assert (config.inbox / "handoff.bat").exists()
+    assert (config.inbox / "Invalid.fbx").exists()
+    assert not any(config.failed.iterdir())
+
+
+def test_process_batch_commits_files_sharing_a_target_in_order(workspace, git):
+    config, _ = workspace
+    config.data["path_template"] = "{type}/latest.{ext}"
+    files = [config.inbox / "Character_A.fbx", config.inbox / "Character_B.fbx"]
+    files[0].write_bytes(b"AAAA")
+    files[1].write_bytes(b"BBBB")
+
+    assert process_batch(files, config, lambda s: None) == (2, 0)
+
+    log = git("log", "--format=%s", cwd=config.repo).stdout.splitlines()
+    assert log[:2] == ["Update: B", "Update: A"]
+    show = "HEAD~1:Assets/Character/latest.fbx"
+    assert git("show", show, cwd=config.repo).stdout == "AAAA"
+    assert git("show", "HEAD:Assets/Character/latest.fbx", cwd=config.repo).stdout == (
+        "BBBB"
+    )
+
+
+def test_plan_does_not_read_files(workspace, monkeypatch):
+    config, _ = workspace
+    (config.inbox / "Video_Intro.mp4").write_bytes(b"v" * 4096)
+    read = []
+    monkeypatch.setattr(pipeline, "file_sha256", lambda path: read.append(path))
+
+    async def make_plans():
+        async with Pipeline(config, lambda s: None, pull=False) as p:
+            return await p.plan([config.inbox / "Video_Intro.mp4"])
+
+    (plan,) = asyncio.run(make_plans())
+    assert plan.valid and plan.sha256 == "" and read == []
+
+
+def test_process_batch_inside_running_event_loop(workspace):
+    config, _ = workspace
+    (config.inbox / "Character_Hero.fbx").write_bytes(b"hero")
+
+    async def main():
+        return process_batch([config.inbox / "Character_Hero.fbx"], config, print)
+
+    assert asyncio.run(main()) == (1, 0)
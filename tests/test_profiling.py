@@ -0,0 +1,13 @@
+from asset_handoffer import GitRepo
+from asset_handoffer.profiling import profile_run
+
+
+def test_profile_run_writes_outputs(tmp_path):
+    lines = []
+    with profile_run("status", tmp_path, lines.append):
+        GitRepo(tmp_path)._run(["--version"], cwd=None)
+
+    assert GitRepo.run_hook is None
+    assert len(list(tmp_path.glob("status-*.pstats"))) == 1
+    assert len(list(tmp_path.glob("status-*.collapsed"))) == 1
+    assert any(line.startswith("  git --version: 1 calls") for line in lines)
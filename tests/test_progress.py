@@ -0,0 +1,58 @@
+import io
+
+from asset_handoffer import GitProgress, GitRepo, ProgressDisplay
+from asset_handoffer.progress import ProgressParser, format_progress
+
+
+def test_parser_emits_events_and_keeps_plain_lines():
+    events = []
+    parser = ProgressParser("origin", events.append)
+    parser.feed("Enumerating objects: 5, done.\nWriting objects:  50% (1/2), ")
+    parser.feed("1.00 MiB | 2.00 MiB/s\rWriting objects: 100% (2/2), ")
+    parser.feed("2.00 MiB | 2.00 MiB/s, done.\nTo /tmp/remote.git\n")
+    parser.close()
+
+    assert [e.phase for e in events] == ["Enumerating objects"] + [
+        "Writing objects"
+    ] * 2
+    half = events[1]
+    assert (half.current, half.total, half.bytes) == (1, 2, 1024**2)
+    assert half.throughput == 2 * 1024**2
+    assert half.eta == 0.5 and not half.done
+    assert events[2].done and events[2].eta is None
+    # \r 刷新的中间状态不出现在 stderr 文本中
+    assert parser.text == (
+        "Enumerating objects: 5, done.\n"
+        "Writing objects: 100% (2/2), 2.00 MiB | 2.00 MiB/s, done.\n"
+        "To /tmp/remote.git\n"
+    )
+
+
+def test_display_prints_finished_transfers_when_not_a_tty():
+    stream = io.StringIO()
+    display = ProgressDisplay(stream)
+    display.update(GitProgress("origin", "Writing objects", 1, 2, 100))
+    display.update(GitProgress("origin", "Resolving deltas", 2, 2, done=True))
+    done = GitProgress("origin", "Writing objects", 2, 2, 2048, 1024.0, done=True)
+    display.update(done)
+
+    assert stream.getvalue() == format_progress(done) + "\n"
+    assert format_progress(done) == (
+        "origin: Writing objects 100% (2/2), 2.0 KiB | 1.0 KiB/s, done"
+    )
+
+
+def test_push_reports_progress(tmp_path, git):
+    remote = tmp_path / "remote.git"
+    work = tmp_path / "work"
+    git("init", "--bare", "-b", "main", str(remote))
+    git("init", "-b", "main", str(work))
+    (work / "a.bin").write_bytes(b"a" * 4096)
+    git("add", "a.bin", cwd=work)
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-m", "a", cwd=work)
+
+    events = []
+    GitRepo(work, progress=events.append).push("main", str(remote))
+
+    assert any(e.phase == "Writing objects" and e.done for e in events)
+    assert {e.label for e in events} == {"push"}
@@ -0,0 +1,23 @@
+from asset_handoffer import Messages, PushGroup, PushTarget
+
+
+def test_push_group_pushes_to_all_remotes(tmp_path, make_remote, git):
+    make_remote("origin")
+    git("init", "--bare", "-b", "main", str(tmp_path / "mirror.git"))
+    work = tmp_path / "origin-seed"
+    targets = [
+        PushTarget("origin", "origin"),
+        PushTarget("mirror", str(tmp_path / "mirror.git"), required=False),
+        PushTarget("missing", str(tmp_path / "missing.git"), required=False),
+    ]
+    group = PushGroup(work, Messages("en-US"), targets, "main").start()
+
+    required = group.wait_required()
+    assert [s.target.name for s in required] == ["origin"]
+    assert required[0].success
+
+    statuses = {s.target.name: s for s in group.wait_all()}
+    assert statuses["mirror"].success
+    assert not statuses["missing"].success
+    assert statuses["missing"].attempts == 1
+    git("rev-parse", "--verify", "main", cwd=tmp_path / "mirror.git")
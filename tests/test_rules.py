@@ -0,0 +1,76 @@
+from asset_handoffer import parse_filename
+from asset_handoffer.rules import RuleStats, explain_filename, rules_disjoint
+
+UI = {"pattern": r"^UI_(?P<name>[^.]+)\.(?P<ext>png)$"}
+AUDIO = {"pattern": r"^Audio_(?P<name>[^.]+)\.(?P<ext>wav)$"}
+ANY_PNG = {"pattern": r"^(?P<type>[^_]+)_(?P<name>[^.]+)\.(?P<ext>png)$"}
+ANY = {"pattern": r"^(?P<type>[^_]+)_(?P<name>[^.]+)\.(?P<ext>\w+)$"}
+
+
+def test_rules_disjoint():
+    assert rules_disjoint(UI, AUDIO)
+    assert rules_disjoint(AUDIO, ANY_PNG)
+    assert not rules_disjoint(UI, ANY_PNG)
+    assert not rules_disjoint(AUDIO, ANY)
+    assert not rules_disjoint({"pattern": r"(?i)^ui_.*\.(?P<ext>png)$"}, AUDIO)
+    # MULTILINE 下 $ 可以在中间的换行符前匹配，两条规则都能匹配 "ax\ny"
+    assert not rules_disjoint(
+        {"pattern": r"(?m)^a(?P<ext>.*)x$"}, {"pattern": r"(?s)^a(?P<ext>.*)y$"}
+    )
+    assert not rules_disjoint(
+        {"pattern": r"^a(?P<ext>(?m:.*x$))"}, {"pattern": r"(?s)^a(?P<ext>.*)y$"}
+    )
+    # 嵌套分组中的非字面量会截断前缀和后缀，两条规则都能匹配 "UI_Btn_ok.png"
+    assert not rules_disjoint(
+        {"pattern": r"^(?P<type>(UI)_[^_]+)_(?P<name>[^.]+)\.(?P<ext>png)$"},
+        {"pattern": r"^UI_Btn_(?P<name>[^.]+)\.(?P<ext>png)$"},
+    )
+    assert not rules_disjoint(
+        {"pattern": r"^((ab).)c(?P<ext>.*)$"}, {"pattern": r"^abX(?P<ext>.*)$"}
+    )
+    assert not rules_disjoint(
+        {"pattern": r"^a(?P<ext>.*)Z(.(bc))$"}, {"pattern": r"^a(?P<ext>.*)Ybc$"}
+    )
+
+
+def test_ordered_only_swaps_disjoint_rules():
+    stats = RuleStats()
+    for _ in range(3):
+        stats.record(AUDIO["pattern"], True, 0.0)
+        stats.record(ANY["pattern"], True, 0.0)
+
+    rules = [UI, ANY_PNG, AUDIO, ANY]
+    ordered = stats.ordered(rules)
+    assert ordered == [AUDIO, UI, ANY_PNG, ANY]
+
+    for name in [
+        "UI_Button.png",
+        "Audio_Theme.wav",
+        "Prop_Sword.png",
+        "Prop_Sword.fbx",
+    ]:
+        assert parse_filename(name, ordered) == parse_filename(name, rules)
+
+
+def test_ordered_keeps_rules_with_nested_groups():
+    nested = {"pattern": r"^((ab).)c(?P<ext>.*)$"}
+    literal = {"pattern": r"^abX(?P<ext>.*)$"}
+    stats = RuleStats()
+    stats.record(literal["pattern"], True, 0.0)
+
+    rules = [nested, literal]
+    assert stats.ordered(rules) == rules
+    assert parse_filename("abXcfoo", rules)["groups"]["ext"] == "foo"
+
+
+def test_explain_filename_and_stats(tmp_path):
+    trials = explain_filename("Audio_Theme.wav", [UI, AUDIO, ANY])
+    assert [t.matched for t in trials] == [False, True]
+
+    stats = RuleStats(tmp_path / "stats.json")
+    parse_filename("Audio_Theme.wav", [UI, AUDIO], stats)
+    stats.save()
+
+    loaded = RuleStats.load(tmp_path / "stats.json")
+    assert loaded.rules[UI["pattern"]]["misses"] == 1
+    assert loaded.hits(AUDIO["pattern"]) == 1
@@ -0,0 +1,87 @@
+import hashlib
+import http.client
+import json
+import socket
+import threading
+
+from asset_handoffer.server import IngestServer
+
+
+def start_server(config):
+    config.data["serve"] = {"batch_window": 0.2, "token": "secret"}
+    server = IngestServer(config, "127.0.0.1", 0, output=lambda s: None)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    return server, thread
+
+
+def put(server, filename, body, headers=None, token="secret"):
+    conn = http.client.HTTPConnection(*server.server_address[:2], timeout=30)
+    headers = {"Authorization": f"Bearer {token}", **(headers or {})}
+    if isinstance(body, bytes):
+        headers["Content-Length"] = str(len(body))
+        conn.request("PUT", f"/{filename}", body, headers)
+    else:
+        conn.request("PUT", f"/{filename}", body, headers, encode_chunked=True)
+    response = conn.getresponse()
+    result = response.status, json.loads(response.read())
+    conn.close()
+    return result
+
+
+def test_serve_commits_streamed_uploads(workspace, git):
+    config, remote = workspace
+    server, thread = start_server(config)
+    try:
+        data = b"hero" * 1000
+        digest = hashlib.sha256(data).hexdigest()
+        status, body = put(
+            server, "Character_Hero.fbx", data, {"X-Content-SHA256": digest}
+        )
+        assert status == 201
+        assert body["sha256"] == digest and body["size"] == len(data)
+        assert body["target"] == "Assets/Character/Hero.fbx"
+
+        status, _ = put(server, "Prop_Sword.fbx", iter([b"sw", b"ord"]))
+        assert status == 201
+        assert (config.repo / "Assets/Prop/Sword.fbx").read_bytes() == b"sword"
+
+        log = git("log", "--format=%s", "main", cwd=remote).stdout.splitlines()
+        assert log[:2] == ["Update: Sword", "Update: Hero"]
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+
+
+def test_serve_rejects_before_reading_body(workspace):
+    config, _ = workspace
+    server, thread = start_server(config)
+    try:
+        assert put(server, "Character_Hero.fbx", b"x", token="wrong")[0] == 401
+        assert put(server, "Invalid.fbx", b"x")[0] == 422
+        assert put(server, "..%2FEscape_Hero.fbx", b"x")[0] == 400
+        status, _ = put(
+            server, "Character_Hero.fbx", b"x", {"X-Content-SHA256": "0" * 64}
+        )
+        assert status == 400
+        assert not any(config.inbox.glob("*.fbx"))
+        assert not any((config.workspace_root / ".uploads").iterdir())
+        assert not any(config.failed.glob("*"))
+
+        # 只发送请求头：不合法的文件名应立即得到 422，而不是 100 Continue
+        with socket.create_connection(server.server_address[:2], timeout=5) as sock:
+            sock.sendall(
+                b"PUT /Invalid.fbx HTTP/1.1\r\n"
+                b"Host: localhost\r\n"
+                b"Authorization: Bearer secret\r\n"
+                b"Content-Length: 1000000000\r\n"
+                b"Expect: 100-continue\r\n\r\n"
+            )
+            response = sock.makefile("rb").read()
+        assert response.startswith(b"HTTP/1.1 422")
+        assert b"100 Continue" not in response
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
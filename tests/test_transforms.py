@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+
+from asset_handoffer import TransformStage, process_batch
+from asset_handoffer.transforms import cache_key, prune_cache
+
+COPY_AS_TXT = {
+    "command": [
+        sys.executable,
+        "-c",
+        "import shutil, sys; shutil.copy(sys.argv[1], sys.argv[2])",
+        "{input}",
+        "{output}",
+    ],
+    "output": "{stem}.txt",
+}
+
+
+def test_transform_stage_runs_and_caches(tmp_path):
+    src = tmp_path / "Audio_Theme.wav"
+    src.write_bytes(b"RIFF")
+
+    with TransformStage(tmp_path / "cache", max_workers=1) as stage:
+        first = stage.run(src, [COPY_AS_TXT])
+
+    assert first.path.name == "Audio_Theme.txt"
+    assert first.path.read_bytes() == b"RIFF"
+    assert not first.cached
+    assert len(first.timings) == 1
+
+    with TransformStage(tmp_path / "cache", max_workers=1) as stage:
+        second = stage.run(src, [COPY_AS_TXT])
+
+    assert second.cached
+    assert second.path == first.path
+
+
+def test_transform_stage_close_cancels_queued_transforms(tmp_path):
+    sleep = {
+        "command": [sys.executable, "-c", "import time; time.sleep(1)"],
+        "output": "{stem}.txt",
+    }
+    stage = TransformStage(tmp_path / "cache", max_workers=1)
+    futures = []
+    for i in range(8):
+        src = tmp_path / f"Audio_{i}.wav"
+        src.write_bytes(bytes([i]))
+        futures.append(stage.submit(src, [sleep]))
+
+    start = time.perf_counter()
+    stage.close()
+    # 进程池会预先把少量任务放入调用队列，这些任务和正在运行的任务无法取消
+    assert sum(f.cancelled() for f in futures) >= 5
+    assert time.perf_counter() - start < 6
+
+
+def test_process_batch_commits_transform_output(workspace, git):
+    config, _ = workspace
+    config.data["naming"] = {
+        "rules": [
+            {
+                "pattern": "^(?P<type>Audio)_(?P<name>[^.]+)\\.(?P<ext>wav)$",
+                "path_template": "{type}/{name}.{ext}",
+                "transforms": [COPY_AS_TXT],
+            }
+        ]
+    }
+    src = config.inbox / "Audio_Theme.wav"
+    src.write_bytes(b"RIFF")
+    # 提交时原文件必须仍在 inbox 中；第二次运行时让提交失败
+    hook = config.repo / ".git" / "hooks" / "pre-commit"
+    hook.write_text(
+        f'#!/bin/sh\ntest -f "{src.as_posix()}" || exit 1\n'
+        f'test -f "{(config.repo / "fail").as_posix()}" && exit 1\nexit 0\n'
+    )
+    hook.chmod(0o755)
+
+    assert process_batch([src], config, lambda s: None) == (1, 0)
+    assert not src.exists()
+    assert git("show", "HEAD:Assets/Audio/Theme.txt", cwd=config.repo).stdout == (
+        "RIFF"
+    )
+
+    (config.repo / "fail").touch()
+    src.write_bytes(b"RIFF2")
+    assert process_batch([src], config, lambda s: None) == (0, 1)
+    assert src.read_bytes() == b"RIFF2"
+    assert not any(config.failed.iterdir())
+    assert git("log", "--format=%s", cwd=config.repo).stdout.count("Theme") == 1
+
+
+def test_cache_key_tracks_version_and_code(tmp_path, monkeypatch):
+    src = tmp_path / "Audio_Theme.wav"
+    src.write_bytes(b"RIFF")
+    module = tmp_path / "studio_transforms.py"
+    module.write_text("def run(src, out_dir):\n    return src\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    versioned = dict(COPY_AS_TXT, version=2)
+    assert cache_key(src, [COPY_AS_TXT]) != cache_key(src, [versioned])
+
+    key = cache_key(src, ["studio_transforms:run"])
+    module.write_text("def run(src, out_dir):\n    return src  # v2\n")
+    assert cache_key(src, ["studio_transforms:run"]) != key
+
+
+def test_prune_cache_removes_unused_entries(tmp_path):
+    old, fresh = tmp_path / "old", tmp_path / "fresh"
+    for entry in (old, fresh):
+        entry.mkdir()
+        (entry / "out.txt").write_text("x")
+    week_ago = time.time() - 7 * 24 * 3600
+    os.utime(old, (week_ago, week_ago))
+
+    assert prune_cache(tmp_path, 0) == 0
+    assert prune_cache(tmp_path, 3) == 1
+    assert not old.exists() and fresh.exists()
+
+
+def test_process_batch_commits_extra_outputs(workspace, git, tmp_path, monkeypatch):
+    (tmp_path / "studio_manifest.py").write_text(
+        "import hashlib\n\n"
+        "def write_manifest(src, out_dir):\n"
+        "    manifest = out_dir / (src.name + '.sha256')\n"
+        "    manifest.write_text(hashlib.sha256(src.read_bytes()).hexdigest())\n"
+        "    return [src, manifest]\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    config, _ = workspace
+    manifest = {"function": "studio_manifest:write_manifest", "output": "{name}"}
+    config.data["naming"] = {
+        "rules": [
+            {
+                "pattern": "^(?P<type>Audio)_(?P<name>[^.]+)\\.(?P<ext>wav)$",
+                "path_template": "{type}/{name}.{ext}",
+                "transforms": [COPY_AS_TXT, manifest],
+            }
+        ]
+    }
+    src = config.inbox / "Audio_Theme.wav"
+    src.write_bytes(b"RIFF")
+
+    assert process_batch([src], config, lambda s: None) == (1, 0)
+    files = git("ls-tree", "-r", "--name-only", "HEAD", cwd=config.repo).stdout
+    assert files.split() == ["Assets/Audio/Theme.txt", "Assets/Audio/Theme.txt.sha256"]